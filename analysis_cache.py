@@ -0,0 +1,150 @@
+"""
+Content-addressed caches for the upload pipeline.
+
+    image bytes --sha256--> caption            (CaptionCache, in memory)
+    normalized caption   --> food analysis JSON (AnalysisCache, memory LRU over SQLite)
+
+Repeated uploads of the same photo skip BLIP, and repeated captions skip the OpenAI call,
+including across restarts.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+ARTICLES = {'a', 'an', 'the'}
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_caption(caption: str) -> str:
+    """Lowercase, drop punctuation and articles, collapse whitespace"""
+    words = re.findall(r"[a-z0-9']+", caption.lower())
+    return ' '.join(word for word in words if word not in ARTICLES)
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU bounded by entry count"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._data), 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+
+class CaptionCache(LRUCache):
+    """Image content hash -> caption"""
+
+    def get_or_compute(self, image_bytes: bytes, compute: Callable[[], str]) -> str:
+        return self.get_or_compute_digest(content_hash(image_bytes), compute)
+
+    def get_or_compute_digest(self, key: str, compute: Callable[[], str]) -> str:
+        """Same, for callers that already hashed the bytes"""
+        caption = self.get(key)
+        if caption is None:
+            caption = compute()
+            self.put(key, caption)
+        return caption
+
+
+class AnalysisCache:
+    """
+    Normalized caption -> parsed analysis dict, with an in-memory LRU in front of a SQLite
+    table. The table keeps at most max_rows rows, evicting the least recently used.
+    """
+
+    def __init__(self, db_path: str, max_rows: int = 10000, memory_entries: int = 1024):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.memory = LRUCache(memory_entries)
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used)")
+        self._conn.commit()
+
+    def get(self, caption: str) -> Optional[Dict]:
+        key = normalize_caption(caption)
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM analysis WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE analysis SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.disk_hits += 1
+        value = json.loads(row[0])
+        self.memory.put(key, value)
+        return value
+
+    def put(self, caption: str, value: Dict):
+        key = normalize_caption(caption)
+        self.memory.put(key, value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis (key, value, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM analysis WHERE key IN ("
+                " SELECT key FROM analysis ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+            self._conn.commit()
+
+    def get_or_compute(self, caption: str, compute: Callable[[], Dict]) -> Dict:
+        """Return the cached analysis or compute it; error results are not cached"""
+        value = self.get(caption)
+        if value is None:
+            value = compute()
+            if isinstance(value, dict) and 'error' not in value:
+                self.put(caption, value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+        return {'memory': self.memory.stats(), 'disk_rows': rows, 'max_rows': self.max_rows,
+                'disk_hits': self.disk_hits}
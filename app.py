@@ -1,20 +1,60 @@
 import os
-import requests  # Make sure this import is at the top
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, jsonify, session
-from werkzeug.utils import secure_filename
-import openai
-from PIL import Image
-import torch
-from transformers import BlipProcessor, BlipForConditionalGeneration
-from openai import OpenAI
+import requests
+from flask import Flask, Response, g, render_template, request, redirect, url_for, send_from_directory, jsonify, session, stream_with_context
 import json
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
+import image_ingest
+from analysis_cache import AnalysisCache, CaptionCache
+from caption_model import CaptionModel
+from caption_resolver import MIN_CONFIDENCE, CaptionResolver
+from caption_service import CaptionBatcher
+from geo_cache import GeoCache
+from http_clients import get_clients
+from inflammation_recipe_calculator import InflammationRecipeCalculator
+from job_queue import QUEUED, RUNNING, JobQueue
+from llm_fanout import LLMFanout
+from llm_parsing import JSON_MODE, ParseError, parse_food_analysis, parse_stores, parse_stats
+from log_store import LogStore
+from menu_planner import MEAL_TYPES
+from observability import (configure_logging, log, new_request_id, registry, request_id_var, request_seconds,
+                           stage_timer)
+from recipe_index import parse_terms
+from score_store import GENERAL
 load_dotenv()
 
 # ——— Flask setup ———
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'change-me')
 
+# JSON log lines, written off the request thread; LOG_LEVEL=DEBUG adds per-stage timings
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'))
+
+@app.before_request
+def start_request():
+    g.request_start = time.perf_counter()
+    g.request_id_token = request_id_var.set(new_request_id(request.headers.get('X-Request-ID')))
+
+@app.after_request
+def finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_seconds.observe(time.perf_counter() - g.request_start,
+                            endpoint=endpoint, method=request.method, status=response.status_code)
+    response.headers['X-Request-ID'] = request_id_var.get()
+    return response
+
+@app.teardown_request
+def end_request(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+def render(template, **context):
+    with stage_timer('template_render'):
+        return render_template(template, **context)
+
 UPLOAD_FOLDER = os.path.join('static', 'uploads')
 ALLOWED_IMG = {'png', 'jpg', 'jpeg', 'gif'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -22,116 +62,317 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-# Simple data structures instead of database
-entries = []
-profile = None
+# Profiles and log entries live in SQLite (WAL), shared by all workers
+store = LogStore(os.getenv('LOG_DB_PATH', os.path.join('data', 'guttrack.sqlite3')))
+ENTRIES_PER_PAGE = int(os.getenv('ENTRIES_PER_PAGE', '20'))
+
+def current_user_id():
+    # Each browser session gets its own user id
+    if 'user_id' not in session:
+        session['user_id'] = uuid.uuid4().hex
+    return session['user_id']
 
 # Helper: allow images
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_IMG
 
 # ——— BLIP setup ———
-processor = BlipProcessor.from_pretrained(
-    "Salesforce/blip-image-captioning-base",
-    use_fast=True
+# Loaded on the first caption; set PRELOAD_CAPTION_MODEL=1 in production to load at startup
+app.config['PRELOAD_CAPTION_MODEL'] = os.getenv('PRELOAD_CAPTION_MODEL', '0').lower() in ('1', 'true', 'yes')
+# CAPTION_BACKEND=int8 runs a dynamically quantized model on CPU-only boxes
+caption_model = CaptionModel(
+    backend=os.getenv('CAPTION_BACKEND', 'fp32'),
+    num_threads=int(os.getenv('CAPTION_THREADS', '0')) or None
 )
-caption_model = BlipForConditionalGeneration.from_pretrained(
-    "Salesforce/blip-image-captioning-base",
-    device_map="auto"
+
+def caption_batch(images):
+    with stage_timer('blip_generate'):
+        return caption_model.caption_images(images)
+
+# Requests share one worker that micro-batches pending images
+caption_batcher = CaptionBatcher(
+    caption_batch,
+    max_batch_size=int(os.getenv('CAPTION_MAX_BATCH_SIZE', '8')),
+    max_wait_ms=float(os.getenv('CAPTION_MAX_WAIT_MS', '20'))
+)
+
+# Identical uploads skip BLIP; repeated captions skip the OpenAI analysis (persisted in SQLite)
+caption_cache = CaptionCache(int(os.getenv('CAPTION_CACHE_ENTRIES', '1024')))
+analysis_cache = AnalysisCache(
+    os.getenv('ANALYSIS_CACHE_PATH', os.path.join('cache', 'analysis_cache.sqlite3')),
+    max_rows=int(os.getenv('ANALYSIS_CACHE_ROWS', '10000'))
 )
-try:
-    caption_model = torch.compile(caption_model)
-except Exception:
-    pass
-model_device = next(caption_model.parameters()).device
-
-def analyze_image(path):
-    image = Image.open(path).convert("RGB")
-    inputs = processor(images=image, return_tensors="pt")
-    inputs['pixel_values'] = inputs['pixel_values'].to(model_device)
-    out = caption_model.generate(**inputs, max_length=50)
-    caption = processor.decode(out[0], skip_special_tokens=True)
-    return caption
-
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+def save_upload(file):
+    """Decode the upload once at model resolution and store a thumbnail named by content hash"""
+    with stage_timer('upload_save'):
+        return image_ingest.ingest(file.read(), app.config['UPLOAD_FOLDER'])
+
+def caption_upload(upload):
+    """Caption an ingested image, reusing the caption of identical bytes"""
+    return caption_cache.get_or_compute_digest(upload.digest, lambda: caption_batcher.caption(upload.image))
+
+def save_and_caption(file):
+    upload = save_upload(file)
+    return upload.filename, upload.path, caption_upload(upload)
+
+if app.config['PRELOAD_CAPTION_MODEL']:
+    caption_model.warm_up()
+
+# Uploads can hand caption + analysis to background workers and return a job id
+jobs = JobQueue(
+    max_workers=int(os.getenv('JOB_WORKERS', '4')),
+    max_jobs=int(os.getenv('JOB_HISTORY', '1000'))
+)
+# Long polls hold a sync request worker, so keep them short; clients back off instead
+JOB_MAX_WAIT = float(os.getenv('JOB_MAX_WAIT', '1'))
+registry.gauge('guttrack_job_queue_depth', 'Background jobs waiting for a worker', lambda: jobs.counts[QUEUED])
+registry.gauge('guttrack_jobs_running', 'Background jobs currently running', lambda: jobs.counts[RUNNING])
+
+def wants_async():
+    # Form field / query ?async=1, or an RFC 7240 "Prefer: respond-async" header
+    return request.values.get('async') == '1' or 'respond-async' in request.headers.get('Prefer', '')
+
+# Shared pooled clients: one keep-alive session and one OpenAI client per process
+http = get_clients()
+client = http.openai()
+
+# Independent LLM calls share one pool; each has its own timeout (seconds)
+llm_fanout = LLMFanout(max_workers=int(os.getenv('LLM_MAX_WORKERS', '8')))
+NUTRITION_TIMEOUT = float(os.getenv('NUTRITION_TIMEOUT', '20'))
+STORES_TIMEOUT = float(os.getenv('STORES_TIMEOUT', '20'))
 
 GOOGLE_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
+PLACES_RADIUS = 2000
+
+# Store lookups are shared per geohash cell (and radius) until they expire
+store_cache = GeoCache(
+    ttl_seconds=float(os.getenv('STORE_CACHE_TTL', '3600')),
+    max_entries=int(os.getenv('STORE_CACHE_ENTRIES', '4096')),
+    precision=int(os.getenv('STORE_CACHE_PRECISION', '6'))
+)
+
+class PlacesError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# ——— Recipe data ———
+# Loaded (from the compiled store when fresh) on the first recipe query, with the general
+# top-k rankings precomputed
+INGREDIENTS_CSV = os.getenv('INGREDIENTS_CSV', 'ingredients_with_inflammation.csv')
+RECIPES_JSON = os.getenv('RECIPES_JSON', 'popular_recipes_database.json')
+RECIPE_PAGE_LIMIT = 500
+# Captions resolved locally at or above this confidence skip the OpenAI analysis (>1 disables)
+CAPTION_LOCAL_CONFIDENCE = float(os.getenv('CAPTION_LOCAL_CONFIDENCE', str(MIN_CONFIDENCE)))
+_recipe_calc = None
+_caption_resolver = None
+_recipe_calc_lock = threading.Lock()
+
+def recipe_calculator():
+    global _recipe_calc
+    if _recipe_calc is None:
+        with _recipe_calc_lock:
+            if _recipe_calc is None:
+                with stage_timer('recipes_load'):
+                    calc = InflammationRecipeCalculator(INGREDIENTS_CSV, RECIPES_JSON, verbose=False)
+                    calc.get_rankings().precompute([GENERAL])
+                _recipe_calc = calc
+    return _recipe_calc
+
+def caption_resolver():
+    global _caption_resolver
+    if _caption_resolver is None:
+        calc = recipe_calculator()
+        with _recipe_calc_lock:
+            if _caption_resolver is None:
+                _caption_resolver = CaptionResolver(calc, min_confidence=CAPTION_LOCAL_CONFIDENCE)
+    return _caption_resolver
+
+def recipe_summary(recipe):
+    return {key: recipe.get(key) for key in (
+        'id', 'title', 'cuisine', 'category', 'difficulty', 'meal_type', 'total_time_minutes', 'servings'
+    )}
+
+def profile_allergies(profile):
+    return parse_terms((profile or {}).get('allergies'))
+
+def basic_suggestions(profile, k=3):
+    """Lowest-inflammation recipes per meal type from the cached rankings; no LLM call"""
+    try:
+        calc = recipe_calculator()
+        with stage_timer('top_recipes'):
+            return {
+                meal_type: [
+                    dict(recipe_summary(top['recipe']), inflammation_score=top['inflammation_score'])
+                    for top in calc.top_recipes(meal_type=meal_type, k=k, exclude_ingredients=profile_allergies(profile))
+                ]
+                for meal_type in MEAL_TYPES
+            }
+    except Exception:
+        log.exception("recipe suggestions failed")
+        return {}
 
 # ——— Routes ———
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+@app.route('/api/caption/metrics')
+def caption_metrics():
+    return jsonify(
+        batcher=caption_batcher.metrics(),
+        caption_cache=caption_cache.stats(),
+        analysis_cache=analysis_cache.stats(),
+        local_resolver=_caption_resolver.stats() if _caption_resolver is not None else None
+    )
+
+@app.route('/api/recipes')
+def api_recipes():
+    """
+    Recipes filtered by meal_type, cuisine, difficulty and category (repeatable, any value
+    matches), max_time/min_time in minutes and exclude (repeatable or comma-separated
+    ingredients or allergen groups). The user's profile allergies are excluded too unless
+    allergies=0. Terms that match no ingredient are listed in `unmatched`, not `excluded`.
+    """
+    exclude = [term for value in request.args.getlist('exclude') for term in parse_terms(value)]
+    if request.args.get('allergies', '1') != '0':
+        exclude += profile_allergies(store.get_profile(current_user_id()))
+    limit = max(0, min(request.args.get('limit', 50, type=int), RECIPE_PAGE_LIMIT))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    calc = recipe_calculator()
+    index = calc.get_recipe_index()
+    unmatched = index.unmatched_terms(exclude)
+    with stage_timer('recipe_query'):
+        rows = index.search(
+            meal_type=request.args.getlist('meal_type'),
+            cuisine=request.args.getlist('cuisine'),
+            difficulty=request.args.getlist('difficulty'),
+            category=request.args.getlist('category'),
+            max_time=request.args.get('max_time', type=int),
+            min_time=request.args.get('min_time', type=int),
+            exclude=exclude
+        )
+    return jsonify(
+        total=len(rows),
+        offset=offset,
+        limit=limit,
+        excluded=[term for term in exclude if term not in unmatched],
+        unmatched=unmatched,
+        recipes=[recipe_summary(calc.recipes[row]) for row in rows[offset:offset + limit]]
+    )
+
+@app.route('/api/recipes/top')
+def api_top_recipes():
+    """
+    The k best recipes (k <= 25 comes from precomputed rankings) for person, optionally of
+    one meal_type; objective=maximize flips the order. Profile allergies are excluded
+    unless allergies=0; those matching no ingredient are listed in `unmatched`.
+    """
+    objective = request.args.get('objective', 'minimize')
+    if objective not in ('minimize', 'maximize'):
+        return jsonify(error="objective must be 'minimize' or 'maximize'"), 400
+    k = max(0, min(request.args.get('k', 5, type=int), RECIPE_PAGE_LIMIT))
+    person = request.args.get('person', GENERAL)
+    meal_type = request.args.get('meal_type') or None
+    if meal_type is not None and meal_type not in MEAL_TYPES:
+        return jsonify(error=f"meal_type must be one of {MEAL_TYPES}"), 400
+    exclude = profile_allergies(store.get_profile(current_user_id())) if request.args.get('allergies', '1') != '0' else []
+
+    calc = recipe_calculator()
+    # Unknown people would silently get general scores, and a cached column and rankings each
+    if person not in calc.people:
+        return jsonify(error=f"unknown person '{person}'"), 400
+    with stage_timer('top_recipes'):
+        top = calc.top_recipes(
+            person, meal_type, k,
+            minimize_inflammation=objective == 'minimize', exclude_ingredients=exclude
+        )
+    unmatched = calc.get_recipe_index().unmatched_terms(exclude)
+    return jsonify(
+        objective=objective,
+        excluded=[term for term in exclude if term not in unmatched],
+        unmatched=unmatched,
+        recipes=[dict(recipe_summary(item['recipe']), inflammation_score=item['inflammation_score']) for item in top]
+    )
+
 @app.route('/api/nearby', methods=['POST'])
 def api_nearby():
     data = request.get_json()
     lat, lng = data.get('lat'), data.get('lng')
-    print(f"🔍 Received coords: {lat}, {lng}", flush=True)
-    print(f"🔑 Using key: {GOOGLE_KEY}", flush=True)
-
-    resp_raw = requests.get(
-        'https://maps.googleapis.com/maps/api/place/nearbysearch/json',
-        params={
-            'key':      GOOGLE_KEY,
-            'location': f'{lat},{lng}',
-            'radius':   2000,
-            'type':     'supermarket'
-        }
-    )
-    print("📡 HTTP status:", resp_raw.status_code, flush=True)
-    resp = resp_raw.json()
-    print("⚙️ Full Google response:\n", json.dumps(resp, indent=2), flush=True)
+    log.debug("nearby lookup at %s,%s", lat, lng)
+
+    try:
+        stores = store_cache.get_or_fetch(
+            'places', lat, lng, PLACES_RADIUS, lambda: fetch_places_stores(lat, lng)
+        )
+    except requests.RequestException as e:
+        return jsonify(error='UPSTREAM_ERROR', message=str(e)), 502
+    except PlacesError as e:
+        return jsonify(error=e.status, message=e.message), 500
+
+    return jsonify(stores=stores)
+
+def fetch_places_stores(lat, lng):
+    with stage_timer('places_nearby'):
+        resp_raw = http.get(
+            'places',
+            'https://maps.googleapis.com/maps/api/place/nearbysearch/json',
+            params={
+                'key':      GOOGLE_KEY,
+                'location': f'{lat},{lng}',
+                'radius':   PLACES_RADIUS,
+                'type':     'supermarket'
+            }
+        )
+        resp = resp_raw.json()
 
     status = resp.get('status')
     if status != 'OK':
-        return jsonify(error=status, message=resp.get('error_message')), 500
+        log.warning("places lookup failed: %s (HTTP %s)", status, resp_raw.status_code)
+        raise PlacesError(status, resp.get('error_message'))
 
     stores = [{
         'name':    p['name'],
         'address': p.get('vicinity'),
     } for p in resp.get('results', [])[:5]]
-    print("🏬 Parsed stores:", stores, flush=True)
-
-    return jsonify(stores=stores)
+    log.debug("places returned %d stores", len(stores))
+    return stores
 
 
 @app.route('/profile', methods=['GET', 'POST'])
 def profile_page():
-    global profile
+    user_id = current_user_id()
     if request.method == 'POST':
-        # 1) Save into the module‐level global
-        profile = {
+        # 1) Save the profile for this user
+        store.save_profile(user_id, {
             'age':        request.form.get('age'),
             'sex':        request.form.get('sex'),
             'diet':       request.form.get('diet'),
             'conditions': request.form.get('conditions'),
             'allergies':  request.form.get('allergies'),
             'medications':request.form.get('medications')
-        }
+        })
         # 2) Redirect to the logger so profile is guaranteed set on the next request
         return redirect(url_for('index'))
     # GET just renders the form with whatever profile exists
-    return render_template('profile.html', profile=profile)
+    return render('profile.html', profile=store.get_profile(user_id))
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
-    print("DEBUG: Entering index function", flush=True)
-    global profile
-    # (DEBUG) print to console so you can see the value
-    print("🔍 profile at start of index():", profile, flush=True)
+    user_id = current_user_id()
+    profile = store.get_profile(user_id)
 
     if request.method == 'POST':
-        print("DEBUG: Request method is POST", flush=True)
         # If they forgot to set a profile, send them there first
         if profile is None:
-            print("DEBUG: Profile is None, redirecting to profile_page", flush=True)
+            log.debug("no profile for %s, redirecting to profile page", user_id)
             return redirect(url_for('profile_page'))
-        print("DEBUG: Profile is set.", flush=True)
 
         # Build the new entry
         entry = {
-            'id':        len(entries),
             'food':      request.form.get('food'),
             'pain':      request.form.get('pain'),
             'symptoms':  request.form.get('symptoms'),
@@ -142,38 +383,61 @@ def index():
             'image':     None,
             'caption':   None
         }
-        print(f"DEBUG: Built new entry: {entry}", flush=True)
 
         # Handle image upload + caption
         file = request.files.get('image')
+        job = None
         if file and allowed_file(file.filename):
-            print("DEBUG: Image file found.", flush=True)
-            filename = secure_filename(file.filename)
-            save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(save_path)
-            entry['image'] = filename
-            entry['caption'] = analyze_image(save_path)
-            print(f"DEBUG: Image saved to {save_path}, caption: {entry['caption']}", flush=True)
+            if wants_async():
+                # Store the entry now; a worker fills in the caption
+                upload = save_upload(file)
+                entry['image'] = upload.filename
+            else:
+                filename, save_path, caption = save_and_caption(file)
+                entry['image'] = filename
+                entry['caption'] = caption
+
+        entry = store.add_entry(user_id, entry)
+        log.debug("stored entry %s for %s", entry['id'], user_id)
 
-        entries.append(entry)
-        print(f"DEBUG: Appended entry to entries. Current entries count: {len(entries)}", flush=True)
+        if entry['image'] and entry['caption'] is None:
+            job = jobs.submit(
+                'entry_caption',
+                lambda job: caption_entry_job(job, user_id, entry['id'], upload),
+                owner=user_id
+            )
 
         # Pass the already‐set profile into the thanks page
-        print("DEBUG: Rendering thanks.html", flush=True)
-        return render_template(
+        return render(
             'thanks.html',
             entry=entry,
-            profile=profile
+            profile=profile,
+            job_status_url=job and url_for('job_status', job_id=job.id)
         )
 
-    # On GET, just show the logger and any past entries
-    print("DEBUG: Request method is GET, rendering index.html", flush=True)
-    return render_template(
+    # On GET, show the logger and one page of past entries
+    page = request.args.get('page', 1, type=int)
+    entries, has_more = store.list_entries(user_id, page, ENTRIES_PER_PAGE)
+    return render(
         'index.html',
         entries=entries,
-        profile=profile
+        profile=profile,
+        page=page,
+        has_more=has_more
     )
     
+def analyze_caption(caption):
+    """Resolve common foods locally; only unclear captions go to the (cached) LLM analysis"""
+    try:
+        with stage_timer('caption_resolve'):
+            analysis = caption_resolver().analyze(caption)
+    except Exception:
+        log.exception("local caption resolve failed")
+        analysis = None
+    if analysis is not None:
+        return analysis
+    return analysis_cache.get_or_compute(caption, lambda: analyze_food_from_caption(caption))
+
 def analyze_food_from_caption(caption, api_key=None):
     """
     Analyze food from caption using OpenAI and return structured info.
@@ -191,14 +455,14 @@ def analyze_food_from_caption(caption, api_key=None):
     if not api_key:
         return {"error": "OpenAI API key not found"}
 
-    client = openai.OpenAI(api_key=api_key)
+    client = http.openai(api_key)
 
     prompt = f"""
     Analyze this food description and extract the ingredients with estimated quantities:
 
     Food: "{caption}"
 
-    Please respond in JSON format:
+    Please respond with a JSON object:
     {{
         "detected_food": "name of the main dish",
         "ingredients": [
@@ -207,194 +471,303 @@ def analyze_food_from_caption(caption, api_key=None):
         ],
         "total_calories": 400,
         "inflammation_level": "low/medium/high",
-        "health_score": 3  # -3 (very unhealthy) to +3 (very healthy)
+        "health_score": 3
     }}
 
+    health_score runs from -3 (very unhealthy) to +3 (very healthy).
+
     Give a rough estimate based on ingredient quality, calories, and inflammation potential.
     """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
+        with http.limit('openai'), stage_timer('openai_food_analysis'):
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=500,
+                response_format=JSON_MODE
+            )
 
         content = response.choices[0].message.content.strip()
 
         try:
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end != 0:
-                json_str = content[start:end]
-                result = json.loads(json_str)
-                return result
-            else:
-                return {"error": "Could not parse JSON from response", "raw_response": content}
-        except json.JSONDecodeError:
-            return {"error": "Invalid JSON in response", "raw_response": content}
+            return parse_food_analysis(content)
+        except ParseError as e:
+            return {"error": f"Invalid JSON in response: {e}", "raw_response": content}
 
     except Exception as e:
         return {"error": f"OpenAI API error: {str(e)}"}
    
 @app.route('/camera', methods=['POST'])
 def camera():
-    # print("DEBUG: Entering /camera route", flush=True)
     # Check if the post request has the file part
     if 'image' not in request.files:
-        # print("DEBUG: No 'image' file part in request", flush=True)
         return jsonify({'error': 'No file part in the request'}), 400
 
     file = request.files['image']
 
     # If the user does not select a file, the browser submits an empty file without a filename.
     if file.filename == '':
-        # print("DEBUG: No selected file", flush=True)
         return jsonify({'error': 'No selected file'}), 400
 
     if file and allowed_file(file.filename):
-        # print(f"DEBUG: File found and allowed: {file.filename}", flush=True)
-        filename = secure_filename(file.filename)
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         try:
-            file.save(save_path)
-            # print(f"DEBUG: File saved successfully to {save_path}", flush=True)
-            caption = analyze_image(save_path)
-            # print(f"DEBUG: Image analyzed, caption: {caption}", flush=True)
-            caption = analyze_food_from_caption(caption)
+            if wants_async():
+                upload = save_upload(file)
+                job = jobs.submit('camera', lambda job: camera_job(job, upload),
+                                  owner=current_user_id())
+                status_url = url_for('job_status', job_id=job.id)
+                return jsonify({'job_id': job.id, 'status_url': status_url}), 202, {'Location': status_url}
+            filename, save_path, caption = save_and_caption(file)
+            caption = analyze_caption(caption)
             return jsonify({'caption': caption})
         except Exception as e:
-            # print(f"DEBUG: Error saving file or analyzing image: {e}", flush=True)
+            log.exception("camera upload failed")
             return jsonify({'error': str(e)}), 500
     else:
-        # print("DEBUG: File not allowed or no file provided", flush=True)
         return jsonify({'error': 'File type not allowed'}), 400
 
-@app.route('/recommendations/<int:entry_id>')
-def recommendations(entry_id):
-    if entry_id >= len(entries):
-        return "Entry not found", 404
-        
-    entry = entries[entry_id]
-    
-    # Construct prompt for OpenAI
-    prompt = f"""
+def caption_entry_job(job, user_id, entry_id, upload):
+    with job.stage('caption'):
+        caption = caption_upload(upload)
+    with job.stage('store'):
+        store.update_entry(user_id, entry_id, caption=caption)
+    return {'entry_id': entry_id, 'caption': caption}
+
+def camera_job(job, upload):
+    with job.stage('caption'):
+        caption = caption_upload(upload)
+    with job.stage('analysis'):
+        analysis = analyze_caption(caption)
+    return {'caption': analysis}
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Job state and result; ?wait=N waits up to N seconds (capped at JOB_MAX_WAIT) for it to finish"""
+    job = jobs.get(job_id, owner=current_user_id())
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    wait = min(request.args.get('wait', 0, type=float), JOB_MAX_WAIT)
+    if wait > 0:
+        jobs.wait(job, wait)
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/metrics')
+def job_metrics():
+    return jsonify(jobs.stats())
+
+NUTRITION_FALLBACK = "Recommendations are taking longer than usual. Please refresh in a moment."
+
+def nutrition_prompt(profile, entry):
+    profile = profile or {}
+    return f"""
     Based on this person's profile and daily log, suggest healthy food recommendations:
-    
+
     Profile:
-    - Age: {profile['age'] if profile else 'Not provided'}
-    - Diet: {profile['diet'] if profile else 'Not provided'}
-    - Medical Conditions: {profile['conditions'] if profile else 'None'}
-    - Allergies: {profile['allergies'] if profile else 'None'}
-    
+    - Age: {profile.get('age') or 'Not provided'}
+    - Diet: {profile.get('diet') or 'Not provided'}
+    - Medical Conditions: {profile.get('conditions') or 'None'}
+    - Allergies: {profile.get('allergies') or 'None'}
+
     Current Status:
     - Energy Level: {entry['energy']}
     - Symptoms: {entry['symptoms']}
     - Mood: {entry['mood']}
-    
+
     Please provide specific food recommendations considering their dietary restrictions and current symptoms.
     """
-    
-    # Call OpenAI API
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a nutritionist providing specific food recommendations."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
-    recommendations = response.choices[0].message.content
-    
-    return render_template('recommendations.html', entry=entry, recommendations=recommendations)
 
-@app.route('/recommendations')
-def latest_recommendations():
-    if not entries:
-        return render_template(
-            'recommendations.html',
-            entry=None,
-            recommendations="No logs yet!",
-            stores=[]
-        )
-
-    latest_entry = entries[-1]
+def nutrition_messages(profile, entry):
+    return [
+        {"role": "system", "content": "You are a nutritionist providing specific food recommendations."},
+        {"role": "user",   "content": nutrition_prompt(profile, entry)}
+    ]
 
-    # —— 1) Food recommendations via GPT-3.5 —— #
-    prompt_nutri = f"""
-    Based on this person's profile and daily log, suggest healthy food recommendations:
+def fetch_nutrition_recommendations(profile, entry):
+    # —— Food recommendations via GPT-3.5 —— #
+    with http.limit('openai'), stage_timer('openai_nutrition'):
+        response = client.with_options(timeout=NUTRITION_TIMEOUT).chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=nutrition_messages(profile, entry)
+        )
+    return response.choices[0].message.content.strip()
 
-    Profile:
-    - Age: {profile.get('age', 'Not provided')}
-    - Diet: {profile.get('diet', 'Not provided')}
-    - Medical Conditions: {profile.get('conditions', 'None')}
-    - Allergies: {profile.get('allergies', 'None')}
+def stream_nutrition_recommendations(profile, entry):
+    """Yield recommendation text deltas as the OpenAI stream delivers them"""
+    start = time.perf_counter()
+    first_token = True
+    try:
+        with http.limit('openai'), stage_timer('openai_nutrition_stream'):
+            stream = client.with_options(timeout=NUTRITION_TIMEOUT).chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=nutrition_messages(profile, entry),
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                if first_token:
+                    llm_fanout.timings.record('nutrition_first_token', time.perf_counter() - start)
+                    first_token = False
+                yield token
+    except Exception:
+        llm_fanout.timings.record('nutrition_stream', time.perf_counter() - start, 'error')
+        raise
+    llm_fanout.timings.record('nutrition_stream', time.perf_counter() - start)
 
-    Current Status:
-    - Energy Level: {latest_entry['energy']}
-    - Symptoms: {latest_entry['symptoms']}
-    - Mood: {latest_entry['mood']}
+def sse_event(data, event=None):
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
 
-    Please provide specific food recommendations considering their dietary restrictions and current symptoms.
-    """
-    resp1 = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a nutritionist providing specific food recommendations."},
-            {"role": "user",   "content": prompt_nutri}
-        ]
-    )
-    recommendations = resp1.choices[0].message.content.strip()
-
-    # —— 2) Nearby grocery stores via GPT-4.1 —— #
-    lat = session.get('latitude')
-    lon = session.get('longitude')
+def fetch_store_suggestions(lat, lon):
+    # —— Nearby grocery stores via GPT-4.1 —— #
     loc_str = f"{lat}, {lon}" if lat and lon else "unknown location"
     prompt_stores = f"""
     Based on the user's location ({loc_str}), list nearby grocery stores in Paris.
-    Return ONLY a Python list assigned to a variable called stores.
-    Each dict must have these keys:
+    Return ONLY a JSON object with a "stores" list.
+    Each store must have these keys:
       name, address, price, healthiness_score
 
     Example:
-    stores = [
-      {{'name': 'Franprix', 'address': '27 Rue…', 'price': '€€', 'healthiness_score': 60}},
-      …
-    ]
+    {{"stores": [
+      {{"name": "Franprix", "address": "27 Rue…", "price": "€€", "healthiness_score": 60}}
+    ]}}
     """
-    resp2 = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=[
-            {"role": "system", "content": "You are a location-based nutrition assistant."},
-            {"role": "user",   "content": prompt_stores}
-        ],
-        temperature=0
-    )
-    text2 = resp2.choices[0].message.content.strip()
-    # Safely exec the list literal
-    namespace = {}
+    with http.limit('openai'), stage_timer('openai_stores'):
+        resp = client.with_options(timeout=STORES_TIMEOUT).chat.completions.create(
+            model="gpt-4.1",
+            messages=[
+                {"role": "system", "content": "You are a location-based nutrition assistant."},
+                {"role": "user",   "content": prompt_stores}
+            ],
+            temperature=0,
+            response_format=JSON_MODE
+        )
+    text = resp.choices[0].message.content.strip()
     try:
-        exec(text2, {}, namespace)
-        stores = namespace.get('stores', [])
-    except Exception:
-        stores = []
+        return parse_stores(text)
+    except ParseError as e:
+        log.warning("could not parse store suggestions: %s", e)
+        return []
+
+def cached_store_suggestions(lat, lon):
+    # Empty lists (unparseable replies) are not cached so the next view retries
+    return store_cache.get_or_fetch(
+        'llm_stores', lat, lon, 0, lambda: fetch_store_suggestions(lat, lon), cache_if=bool
+    )
+
+@app.route('/recommendations/<int:entry_id>')
+def recommendations(entry_id):
+    user_id = current_user_id()
+    entry = store.get_entry(user_id, entry_id)
+    if entry is None:
+        return "Entry not found", 404
+
+    profile = store.get_profile(user_id)
+    suggestions = basic_suggestions(profile)
+
+    # ?basic=1 shows only the recipe suggestions and skips the LLM entirely
+    if request.args.get('basic') == '1':
+        return render('recommendations.html', entry=entry, suggestions=suggestions)
+
+    # The page renders at once and fills in from the stream; ?stream=0 waits for the full text
+    if request.args.get('stream', '1') != '0':
+        return render(
+            'recommendations.html',
+            entry=entry,
+            suggestions=suggestions,
+            stream_url=url_for('recommendations_stream', entry_id=entry_id)
+        )
+
+    recommendations = llm_fanout.call(
+        'nutrition', fetch_nutrition_recommendations, NUTRITION_TIMEOUT, NUTRITION_FALLBACK,
+        profile, entry
+    )
+    return render('recommendations.html', entry=entry, recommendations=recommendations, suggestions=suggestions)
+
+@app.route('/recommendations/<int:entry_id>/stream')
+def recommendations_stream(entry_id):
+    """Server-sent events: one "data" event per text delta, then "done" (or "error")"""
+    user_id = current_user_id()
+    entry = store.get_entry(user_id, entry_id)
+    if entry is None:
+        return "Entry not found", 404
+    profile = store.get_profile(user_id)
+
+    def events():
+        try:
+            for token in stream_nutrition_recommendations(profile, entry):
+                yield sse_event({'token': token})
+        except Exception:
+            yield sse_event({'message': NUTRITION_FALLBACK}, event='error')
+            return
+        yield sse_event({}, event='done')
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/recommendations')
+def latest_recommendations():
+    user_id = current_user_id()
+    latest_entry = store.latest_entry(user_id)
+    profile = store.get_profile(user_id)
+    # Recipe ideas come from precomputed rankings, so they cost no LLM call
+    suggestions = basic_suggestions(profile)
+    if latest_entry is None:
+        return render(
+            'recommendations.html',
+            entry=None,
+            recommendations="No logs yet!",
+            suggestions=suggestions,
+            stores=[]
+        )
+    if request.args.get('basic') == '1':
+        return render('recommendations.html', entry=latest_entry, suggestions=suggestions)
+
+    lat = session.get('latitude')
+    lon = session.get('longitude')
+
+    if request.args.get('stream', '1') != '0':
+        # Warm the store cache while the page loads; the page's /locations call then
+        # hits the cache or joins this in-flight lookup
+        llm_fanout.submit('stores', cached_store_suggestions, lat, lon)
+        return render(
+            'recommendations.html',
+            entry=latest_entry,
+            suggestions=suggestions,
+            stream_url=url_for('recommendations_stream', entry_id=latest_entry['id'])
+        )
+
+    # Both LLM calls run concurrently; each falls back on its own if slow or failing
+    results = llm_fanout.gather({
+        'nutrition': (lambda: fetch_nutrition_recommendations(profile, latest_entry),
+                      NUTRITION_TIMEOUT, NUTRITION_FALLBACK),
+        'stores': (lambda: cached_store_suggestions(lat, lon), STORES_TIMEOUT, [])
+    })
 
     # —— Render both into the template —— #
-    return render_template(
+    return render(
         'recommendations.html',
         entry=latest_entry,
-        recommendations=recommendations,
-        stores=stores
+        recommendations=results['nutrition'],
+        suggestions=suggestions,
+        stores=results['stores']
     )
 
 
 @app.route('/recommendations/location', methods=['POST'])
 def save_location():
     data = request.get_json()
-    print("📍 Received location data:", data, flush=True)
     session['latitude'] = data.get('latitude')
     session['longitude'] = data.get('longitude')
     return '', 204          # empty body, HTTP 204 No Content
@@ -402,52 +775,27 @@ def save_location():
 #connected
 @app.route('/locations', methods=['GET'])
 def get_nearby_stores():
-    print("DEBUG: Entering get_nearby_stores function", flush=True)
-    # —— 2) Nearby grocery stores via GPT-4.1 —— #
     lat = session.get('latitude')
     lon = session.get('longitude')
-    print(f"DEBUG: Retrieved lat: {lat}, lon: {lon} from session", flush=True)
-    loc_str = f"{lat}, {lon}" if lat and lon else "unknown location"
-    print(f"DEBUG: Constructed loc_str: {loc_str}", flush=True)
-    prompt_stores = f"""
-Based on the user's location ({loc_str}), list nearby grocery stores in Paris.
-Return ONLY a Python list assigned to a variable called stores.
-Each dict must have these keys:
-  name, address, price, healthiness_score
-
-Example:
-stores = [
-  {{'name': 'Franprix', 'address': '27 Rue…', 'price': '€€', 'healthiness_score': 60}},
-]
-"""
-
-    print("DEBUG: Calling OpenAI API for stores...", flush=True)
-    resp = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=[
-            {"role": "system", "content": "You are a location-based nutrition assistant."},
-            {"role": "user",   "content": prompt_stores}
-        ],
-        temperature=0
-    )
-    text = resp.choices[0].message.content.strip()
-    print(f"DEBUG: Received text from OpenAI: {text}", flush=True)
-    # Safely exec the list literal
-    namespace = {}
-    try:
-        print("DEBUG: Attempting to exec OpenAI response...", flush=True)
-        exec(text, {}, namespace)
-        stores = namespace.get('stores', [])
-        print(f"DEBUG: Successfully parsed stores from exec. Stores: {stores}", flush=True)
-    except Exception as e:
-        print(f"DEBUG: Failed to exec OpenAI response: {e}", flush=True)
-        stores = []
-        print("DEBUG: stores list is empty due to error.", flush=True)
-
-    print("DEBUG: Returning jsonify(stores)", flush=True)
+    stores = llm_fanout.call('stores', cached_store_suggestions, STORES_TIMEOUT, [], lat, lon)
     return jsonify(stores)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/llm/metrics')
+def llm_metrics():
+    return jsonify(llm_fanout.timings.stats())
+
+@app.route('/api/llm/parsing')
+def llm_parsing_metrics():
+    return jsonify(parse_stats.stats())
+
+@app.route('/api/stores/metrics')
+def store_cache_metrics():
+    return jsonify(store_cache.stats())
+
 
 if __name__ == '__main__':
-    # debug=True ensures you see the print(...) output
     app.run(debug=True, use_reloader=False, host='0.0.0.0', port=8000)
@@ -0,0 +1,162 @@
+"""
+Generate weekly menus and shopping lists for many people across a process pool.
+
+    python batch_menus.py --persons general sam andrea --workers 4 --out batch_output
+    python batch_menus.py --persons-file people.txt
+
+Output is compact: recipes.json holds the shared recipe table once, and menus.ndjson has
+one JSON line per person that refers to recipes by ID.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from inflammation_recipe_calculator import InflammationRecipeCalculator
+
+# Calculator shared by the worker processes (inherited via fork, or built once per worker),
+# keyed by the source paths it was loaded from
+_calc: Optional[InflammationRecipeCalculator] = None
+_calc_sources: Optional[Tuple[str, str]] = None
+_options: Dict = {}
+
+
+def _load_calculator(ingredients_csv_path: str, recipes_json_path: str) -> InflammationRecipeCalculator:
+    """The shared calculator, rebuilt when asked for different source files"""
+    global _calc, _calc_sources
+    sources = (os.path.abspath(ingredients_csv_path), os.path.abspath(recipes_json_path))
+    if _calc is None or _calc_sources != sources:
+        _calc = InflammationRecipeCalculator(ingredients_csv_path, recipes_json_path, verbose=False)
+        _calc_sources = sources
+    return _calc
+
+
+def _init_worker(ingredients_csv_path: str, recipes_json_path: str, options: Dict):
+    global _options
+    _load_calculator(ingredients_csv_path, recipes_json_path)
+    _options = options
+
+
+def compact_menu(weekly_menu: Dict) -> Dict:
+    """Replace the embedded recipe copies with recipe IDs"""
+    return {
+        day: {
+            meal_type: {
+                'recipe_id': meal['recipe']['id'],
+                'inflammation_score': meal['inflammation_score']
+            }
+            for meal_type, meal in meals.items()
+        }
+        for day, meals in weekly_menu.items()
+    }
+
+
+def plan_person(person: str) -> Dict:
+    """Build one person's compact menu and shopping list in a worker"""
+    menu = _calc.create_weekly_menu(person, **_options)
+    if 'error' in menu:
+        return {'person': person, 'error': menu['error']}
+    shopping_list = _calc.generate_shopping_list(menu)
+    return {
+        'person': person,
+        'optimization_goal': menu['optimization_goal'],
+        'weekly_menu': compact_menu(menu['weekly_menu']),
+        'unfilled_slots': menu['unfilled_slots'],
+        'statistics': menu['statistics'],
+        'shopping_list': {
+            name: {'unit': item['unit'], 'total_quantity': item['total_quantity']}
+            for name, item in shopping_list['shopping_list'].items()
+        }
+    }
+
+
+def generate_menus(persons: Optional[Iterable[str]], workers: Optional[int] = None,
+                   ingredients_csv_path: str = 'ingredients_with_inflammation.csv',
+                   recipes_json_path: str = 'popular_recipes_database.json',
+                   chunksize: int = 16, **menu_options) -> Iterator[Dict]:
+    """
+    Yield compact menu records as workers finish them (order is not preserved).
+    persons=None plans for everyone in the score data ('general' and every user with overrides).
+    """
+    # Load once in the parent so forked workers share the calculator pages
+    calc = _load_calculator(ingredients_csv_path, recipes_json_path)
+    if persons is None:
+        persons = calc.people
+    # Build the derived structures before forking too, instead of once per worker
+    calc.get_score_cache()
+    calc.get_recipe_index()
+    calc.get_rankings()
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    with context.Pool(workers, initializer=_init_worker,
+                      initargs=(ingredients_csv_path, recipes_json_path, menu_options)) as pool:
+        yield from pool.imap_unordered(plan_person, persons, chunksize=chunksize)
+
+
+def write_batch(persons: Optional[List[str]], out_dir: str, workers: Optional[int] = None, **kwargs) -> Dict:
+    """Write recipes.json and menus.ndjson to out_dir and return throughput numbers"""
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    records = 0
+    errors = 0
+    menus_path = os.path.join(out_dir, 'menus.ndjson')
+    with open(menus_path, 'w', encoding='utf-8') as file:
+        for record in generate_menus(persons, workers, **kwargs):
+            file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            file.write('\n')
+            records += 1
+            errors += 'error' in record
+
+    recipes_path = os.path.join(out_dir, 'recipes.json')
+    with open(recipes_path, 'w', encoding='utf-8') as file:
+        json.dump({recipe['id']: recipe for recipe in _calc.recipes}, file,
+                  ensure_ascii=False, separators=(',', ':'))
+
+    elapsed = time.perf_counter() - start
+    return {
+        'persons': records,
+        'errors': errors,
+        'workers': workers or os.cpu_count(),
+        'elapsed_seconds': round(elapsed, 3),
+        'persons_per_second': round(records / elapsed, 1) if elapsed > 0 else None,
+        'menus_bytes': os.path.getsize(menus_path),
+        'bytes_per_person': os.path.getsize(menus_path) // records if records else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch weekly menu and shopping list generation")
+    parser.add_argument('--persons', nargs='*', default=None, help="people to plan for (default: everyone in the score data)")
+    parser.add_argument('--persons-file', help="file with one person per line")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='batch_output')
+    parser.add_argument('--maximize', action='store_true', help="maximize instead of minimize inflammation")
+    parser.add_argument('--no-repeat-days', type=int, default=7)
+    parser.add_argument('--max-daily-time', type=int, default=None)
+    parser.add_argument('--max-cuisine-per-day', type=int, default=None)
+    args = parser.parse_args()
+
+    persons = list(args.persons or [])
+    if args.persons_file:
+        with open(args.persons_file, 'r', encoding='utf-8') as file:
+            persons.extend(line.strip() for line in file if line.strip())
+    stats = write_batch(
+        persons or None, args.out, args.workers,
+        minimize_inflammation=not args.maximize,
+        no_repeat_days=args.no_repeat_days,
+        max_daily_time=args.max_daily_time,
+        max_cuisine_per_day=args.max_cuisine_per_day
+    )
+    print(f"Planned {stats['persons']} menus in {stats['elapsed_seconds']}s "
+          f"({stats['persons_per_second']} persons/s, {stats['workers']} workers)")
+    print(f"Wrote {stats['menus_bytes']} bytes ({stats['bytes_per_person']} bytes/person) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ingredient_matcher import IngredientMatcher
+from score_store import ScoreStore
+
+
+def round_averages(totals: np.ndarray, matched: np.ndarray) -> List[float]:
+    """Rounded average per recipe, 0 where nothing matched (the per-recipe dict convention)"""
+    averages = totals / np.maximum(matched, 1)
+    return [round(float(avg), 3) if count > 0 else 0 for avg, count in zip(averages, matched)]
+
+
+class BatchScores:
+    """
+    Inflammation scores for every recipe and every person, as (recipes x people) arrays
+    """
+
+    def __init__(self, recipe_ids: List, people: List[str], totals: np.ndarray,
+                 matched: np.ndarray, ingredient_counts: np.ndarray):
+        self.recipe_ids = recipe_ids
+        self.people = people
+        self.recipe_index = {recipe_id: i for i, recipe_id in enumerate(recipe_ids)}
+        self.person_index = {person: j for j, person in enumerate(people)}
+        self.totals = totals
+        self.matched = matched
+        self.ingredient_counts = ingredient_counts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.averages = np.where(matched > 0, totals / np.maximum(matched, 1), 0.0)
+            self.match_percentages = np.where(
+                ingredient_counts[:, None] > 0,
+                matched / np.maximum(ingredient_counts, 1)[:, None] * 100,
+                0.0
+            )
+
+    def column(self, person: str) -> int:
+        if person not in self.person_index:
+            raise KeyError(f"No inflammation data column for '{person}'")
+        return self.person_index[person]
+
+    def average_scores(self, person: str) -> List[float]:
+        """Rounded average scores for one person, in recipe order (matches the per-recipe dicts)"""
+        j = self.column(person)
+        return round_averages(self.totals[:, j], self.matched[:, j])
+
+    def summary(self, recipe_id, person: str) -> Dict:
+        """Score summary for one recipe and person, without ingredient details"""
+        i = self.recipe_index[recipe_id]
+        j = self.column(person)
+        return {
+            'recipe_id': recipe_id,
+            'person': person,
+            'total_inflammation_score': round(float(self.totals[i, j]), 3),
+            'average_inflammation_score': round(float(self.averages[i, j]), 3) if self.matched[i, j] > 0 else 0,
+            'matched_ingredients': int(self.matched[i, j]),
+            'total_ingredients': int(self.ingredient_counts[i]),
+            'match_percentage': round(float(self.match_percentages[i, j]), 1)
+        }
+
+
+class BatchScorer:
+    """
+    Compile recipes into a sparse recipe x ingredient quantity matrix, then score everything
+    in one pass against a ScoreStore (general scores plus per-user overrides)
+    """
+
+    def __init__(self, recipe_ids: List, score_store: ScoreStore, entry_recipes: np.ndarray,
+                 entry_ingredients: np.ndarray, entry_weights: np.ndarray, ingredient_counts: np.ndarray):
+        self.recipe_ids = recipe_ids
+        # Scores are resolved per person at scoring time, so users added later need no recompile
+        self.score_store = score_store
+        # Recipe x ingredient quantities in COO form, one entry per matched recipe ingredient
+        self.entry_recipes = entry_recipes
+        self.entry_ingredients = entry_ingredients
+        self.entry_weights = entry_weights
+        self.ingredient_counts = ingredient_counts
+
+    @property
+    def people(self) -> List[str]:
+        return self.score_store.people()
+
+    @property
+    def ingredient_names(self) -> List[str]:
+        return self.score_store.names
+
+    @classmethod
+    def compile(cls, recipes: List[Dict], score_store: ScoreStore, matcher: IngredientMatcher) -> 'BatchScorer':
+        """Build the quantity matrix from parsed recipes; matcher names must be score_store names"""
+        entry_recipes = []
+        entry_ingredients = []
+        entry_weights = []
+        ingredient_counts = []
+        for recipe_row, recipe in enumerate(recipes):
+            ingredient_counts.append(len(recipe['ingredients']))
+            for ingredient in recipe['ingredients']:
+                matched = matcher.match(ingredient['name'])
+                if matched is None:
+                    continue
+                entry_recipes.append(recipe_row)
+                entry_ingredients.append(score_store.index[matched])
+                entry_weights.append(ingredient['quantity'] / 100)  # Normalize by 100g
+
+        return cls(
+            [recipe['id'] for recipe in recipes],
+            score_store,
+            np.array(entry_recipes, dtype=np.intp),
+            np.array(entry_ingredients, dtype=np.intp),
+            np.array(entry_weights, dtype=np.float64),
+            np.array(ingredient_counts, dtype=np.int64)
+        )
+
+    def score_all(self, people: Optional[Sequence[str]] = None) -> BatchScores:
+        """Total, average and match percentage for every recipe x person"""
+        people = self.people if people is None else list(people)
+        # Each person's override-else-general score for every entry (people without overrides get general)
+        entry_scores = np.empty((len(self.entry_ingredients), len(people)))
+        for col, person in enumerate(people):
+            entry_scores[:, col] = self.score_store.resolve(person, self.entry_ingredients)
+        mask = ~np.isnan(entry_scores)
+        weighted = np.where(mask, entry_scores * self.entry_weights[:, None], 0.0)
+
+        # np.add.at accumulates in entry order, so totals match the sequential per-recipe sums
+        shape = (len(self.recipe_ids), len(people))
+        totals = np.zeros(shape)
+        matched = np.zeros(shape, dtype=np.int64)
+        np.add.at(totals, self.entry_recipes, weighted)
+        np.add.at(matched, self.entry_recipes, mask.astype(np.int64))
+
+        return BatchScores(self.recipe_ids, list(people), totals, matched, self.ingredient_counts)
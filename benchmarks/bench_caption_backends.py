@@ -0,0 +1,114 @@
+"""
+Compare caption backends (fp32 vs dynamic int8) on the bundled sample images.
+
+Each backend runs in a fresh interpreter so load time and peak RSS are not shared. Reports
+model load time, per-image latency, peak memory, and how closely each backend's captions
+agree with fp32 (exact matches and mean word overlap).
+
+Run from the repository root:
+    python benchmarks/bench_caption_backends.py [--runs 5] [--threads 4] [--json out.json]
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_IMAGES = [os.path.join(ROOT, 'static', 'uploads', 'Banana-Single.jpg')]
+
+# Child process: load one backend, caption every image `runs` times, report as JSON
+PROBE = """
+import json, resource, statistics, sys, time
+from caption_model import CaptionModel
+from image_ingest import MODEL_SIZE, decode
+
+backend, threads, runs, paths = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4:]
+images = [decode(open(path, 'rb').read(), MODEL_SIZE).resize((MODEL_SIZE, MODEL_SIZE)) for path in paths]
+model = CaptionModel(backend=backend, num_threads=threads or None)
+
+start = time.perf_counter()
+model.load()
+load_seconds = time.perf_counter() - start
+model.caption_images(images[:1])  # warm-up
+
+latencies = []
+for _ in range(runs):
+    for image in images:
+        start = time.perf_counter()
+        captions = model.caption_images([image])
+        latencies.append(time.perf_counter() - start)
+batch_start = time.perf_counter()
+captions = model.caption_images(images)
+batch_seconds = time.perf_counter() - batch_start
+
+print(json.dumps({
+    'load_seconds': load_seconds,
+    'p50_ms': statistics.median(latencies) * 1000,
+    'max_ms': max(latencies) * 1000,
+    'batch_ms_per_image': batch_seconds * 1000 / len(images),
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'captions': captions
+}))
+"""
+
+
+def run_backend(backend: str, threads: int, runs: int, images):
+    result = subprocess.run([sys.executable, '-c', PROBE, backend, str(threads), str(runs)] + images,
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        reason = result.stderr.strip().splitlines()[-1] if result.stderr else 'unknown error'
+        print(f"{backend}: failed: {reason}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def word_overlap(a: str, b: str) -> float:
+    words_a, words_b = set(a.lower().split()), set(b.lower().split())
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backends', nargs='+', default=['fp32', 'int8'])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=0, help="torch threads (0 = torch default)")
+    parser.add_argument('--images', nargs='+', default=None,
+                        help="image paths (default: the bundled Banana-Single.jpg)")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    images = args.images or [path for path in DEFAULT_IMAGES if os.path.exists(path)]
+    images = [path for pattern in images for path in sorted(glob.glob(pattern))]
+    if not images:
+        print("No sample images found")
+        return
+
+    results = {backend: run_backend(backend, args.threads, args.runs, images) for backend in args.backends}
+    reference = results.get('fp32')
+    for backend, result in results.items():
+        if result is None:
+            continue
+        if reference and backend != 'fp32':
+            pairs = list(zip(reference['captions'], result['captions']))
+            result['exact_agreement'] = sum(a == b for a, b in pairs) / len(pairs)
+            result['word_overlap'] = sum(word_overlap(a, b) for a, b in pairs) / len(pairs)
+        print(f"{backend:5s} load {result['load_seconds']:6.1f} s  "
+              f"p50 {result['p50_ms']:7.1f} ms  max {result['max_ms']:7.1f} ms  "
+              f"batched {result['batch_ms_per_image']:7.1f} ms/img  "
+              f"peak RSS {result['max_rss_mb']:7.1f} MB"
+              + (f"  agreement {result['exact_agreement']:.0%} exact, {result['word_overlap']:.2f} overlap"
+                 if 'exact_agreement' in result else ''))
+        for path, caption in zip(images, result['captions']):
+            print(f"      {os.path.basename(path)}: {caption}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'images': images, 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
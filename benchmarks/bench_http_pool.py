@@ -0,0 +1,125 @@
+"""
+Compare per-call requests.get against the pooled HTTPClients session on a local stub server.
+
+The stub answers JSON after a small delay and counts TCP connections, so the run shows
+connection reuse, latency percentiles under concurrent load, and retries on flaky 503s.
+
+Run from the repository root:
+    python benchmarks/bench_http_pool.py [--requests 400] [--concurrency 16]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_clients import HTTPClients, UpstreamLimiter, build_session
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+    delay = 0.005
+    fail_every = 0
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            count = self.server.requests
+        time.sleep(self.delay)
+        if self.fail_every and count % self.fail_every == 0:
+            status, body = 503, b'{"status": "UNAVAILABLE"}'
+        else:
+            status, body = 200, json.dumps({'status': 'OK', 'results': []}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(fail_every: int = 0):
+    handler = type('Handler', (StubHandler,), {'fail_every': fail_every})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(get, url: str, total: int, concurrency: int):
+    latencies = []
+    statuses = []
+
+    def one(_):
+        start = time.perf_counter()
+        response = get(url)
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latencies)
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+        'ok': statuses.count(200)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    server = start_stub()
+    url = f"http://127.0.0.1:{server.server_address[1]}/nearbysearch"
+    unpooled = run(lambda u: requests.get(u, timeout=5), url, args.requests, args.concurrency)
+    unpooled['connections'] = server.connections
+    server.shutdown()
+
+    server = start_stub()
+    url = f"http://127.0.0.1:{server.server_address[1]}/nearbysearch"
+    clients = HTTPClients(session=build_session(pool_size=args.concurrency),
+                          limiter=UpstreamLimiter(args.concurrency))
+    pooled = run(lambda u: clients.get('stub', u), url, args.requests, args.concurrency)
+    pooled['connections'] = server.connections
+    server.shutdown()
+
+    # Every 5th request fails with 503; retries with backoff should hide them
+    server = start_stub(fail_every=5)
+    url = f"http://127.0.0.1:{server.server_address[1]}/nearbysearch"
+    flaky_clients = HTTPClients(session=build_session(pool_size=args.concurrency, backoff_factor=0.01))
+    flaky = run(lambda u: flaky_clients.get('stub', u), url, args.requests, args.concurrency)
+    flaky['upstream_requests'] = server.requests
+    server.shutdown()
+
+    print(f"requests.get per call: {unpooled}")
+    print(f"pooled session:        {pooled}")
+    print(f"pooled, 20% 503s:      {flaky}")
+
+
+if __name__ == "__main__":
+    main()
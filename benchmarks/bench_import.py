@@ -0,0 +1,68 @@
+"""
+Measure cold-start cost of importing app.py in a fresh interpreter, with the caption model
+loaded lazily (default) and preloaded (PRELOAD_CAPTION_MODEL=1).
+
+Run from the repository root:
+    python benchmarks/bench_import.py [--runs 5] [--skip-preload]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Child process: import the app and report wall time and peak RSS
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'seconds': elapsed, 'max_rss_mb': rss_kb / 1024, 'model_loaded': app.caption_model.loaded}))
+"""
+
+
+def measure(preload: bool, runs: int):
+    env = dict(os.environ, PRELOAD_CAPTION_MODEL='1' if preload else '0')
+    # The OpenAI client is built at import time and refuses to start without a key
+    env.setdefault('OPENAI_API_KEY', 'benchmark')
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            reason = result.stderr.strip().splitlines()[-1] if result.stderr else 'unknown error'
+            print(f"{'preload' if preload else 'lazy'} import failed: {reason}")
+            return None
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        'median_seconds': statistics.median(s['seconds'] for s in samples),
+        'max_rss_mb': max(s['max_rss_mb'] for s in samples),
+        'model_loaded': samples[-1]['model_loaded']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--skip-preload', action='store_true', help="only measure the lazy import")
+    args = parser.parse_args()
+
+    modes = [('lazy', False)] + ([] if args.skip_preload else [('preload', True)])
+    results = {}
+    for name, preload in modes:
+        results[name] = measure(preload, args.runs if not preload else max(1, args.runs // 2))
+        if results[name]:
+            print(f"{name:8s} import: {results[name]['median_seconds'] * 1000:8.1f} ms  "
+                  f"peak RSS {results[name]['max_rss_mb']:7.1f} MB  "
+                  f"model loaded: {results[name]['model_loaded']}")
+    if results.get('lazy') and results.get('preload'):
+        gain = results['preload']['median_seconds'] - results['lazy']['median_seconds']
+        print(f"Cold-start gain from lazy loading: {gain:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
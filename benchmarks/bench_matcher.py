@@ -0,0 +1,108 @@
+"""
+Benchmark the indexed IngredientMatcher against the original linear substring scan.
+
+Run from the repository root:
+    python benchmarks/bench_matcher.py
+"""
+import os
+import random
+import sys
+import time
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingredient_matcher import INGREDIENT_MAPPINGS, IngredientMatcher
+from inflammation_recipe_calculator import InflammationRecipeCalculator
+
+
+def linear_scan_match(ingredients_inflammation: Dict, recipe_ingredient: str) -> Optional[str]:
+    """The original find_ingredient_match: direct lookup, full substring scan, then mappings"""
+    recipe_ingredient = recipe_ingredient.lower().strip()
+    if recipe_ingredient in ingredients_inflammation:
+        return recipe_ingredient
+    for db_ingredient in ingredients_inflammation.keys():
+        if recipe_ingredient in db_ingredient or db_ingredient in recipe_ingredient:
+            return db_ingredient
+    if recipe_ingredient in INGREDIENT_MAPPINGS:
+        mapped_ingredient = INGREDIENT_MAPPINGS[recipe_ingredient]
+        if mapped_ingredient in ingredients_inflammation:
+            return mapped_ingredient
+    return None
+
+
+def build_queries(calc: InflammationRecipeCalculator, seed: int = 0):
+    """Recipe ingredient names plus perturbed database names to exercise every match path"""
+    rng = random.Random(seed)
+    queries = [ingredient['name'] for recipe in calc.recipes for ingredient in recipe['ingredients']]
+    names = list(calc.ingredients_inflammation.keys())
+    for name in rng.sample(names, min(200, len(names))):
+        words = name.split()
+        queries.append(name)
+        queries.append(f"fresh {name}")
+        queries.append(rng.choice(words) if words else name)
+        queries.append(name[:rng.randint(1, max(1, len(name)))])
+    queries.extend(['', 'xyzzy', 'ground beef', 'egg noodles', 'vegetable oil'])
+    return queries
+
+
+def time_calls(fn, queries, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return time.perf_counter() - start
+
+
+def main():
+    calc = InflammationRecipeCalculator(compiled_store_dir=None)
+    db = calc.ingredients_inflammation
+    queries = build_queries(calc)
+
+    # Correctness: the index must pick the same first hit as the scan
+    matcher = IngredientMatcher(db.keys())
+    mismatches = [q for q in queries if matcher.match(q) != linear_scan_match(db, q)]
+    if mismatches:
+        print(f"MISMATCH on {len(mismatches)} queries, e.g. {mismatches[:5]}")
+        sys.exit(1)
+    print(f"Verified {len(queries)} queries against the linear scan")
+
+    repeat = 20
+    scan_time = time_calls(lambda q: linear_scan_match(db, q), queries, repeat)
+
+    start = time.perf_counter()
+    cold = IngredientMatcher(db.keys())
+    cold.build_index()
+    build_time = time.perf_counter() - start
+    cold_time = time_calls(cold._resolve, queries, repeat)
+    memo_time = time_calls(cold.match, queries, repeat)
+
+    calls = len(queries) * repeat
+    print(f"Index build:          {build_time * 1000:8.2f} ms")
+    print(f"Linear scan:          {scan_time / calls * 1e6:8.2f} us/call")
+    print(f"Index (no memo):      {cold_time / calls * 1e6:8.2f} us/call  ({scan_time / cold_time:5.1f}x)")
+    print(f"Index (memoized):     {memo_time / calls * 1e6:8.2f} us/call  ({scan_time / memo_time:5.1f}x)")
+
+    # End to end: score every recipe for every person
+    people = ['general', 'sam', 'andrea']
+    original = calc.find_ingredient_match
+    calc.find_ingredient_match = lambda name: linear_scan_match(db, name)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for recipe in calc.recipes:
+            for person in people:
+                calc.calculate_recipe_inflammation_score(recipe, person)
+    scan_scoring = time.perf_counter() - start
+    calc.find_ingredient_match = original
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for recipe in calc.recipes:
+            for person in people:
+                calc.calculate_recipe_inflammation_score(recipe, person)
+    index_scoring = time.perf_counter() - start
+    print(f"Recipe scoring:       scan {scan_scoring * 1000:.1f} ms, index {index_scoring * 1000:.1f} ms "
+          f"({scan_scoring / index_scoring:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
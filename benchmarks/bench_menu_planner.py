@@ -0,0 +1,99 @@
+"""
+Benchmark WeeklyMenuPlanner on synthetic recipe pools against the original greedy list rebuilds.
+
+Run from the repository root:
+    python benchmarks/bench_menu_planner.py [--recipes 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_planner import DAYS, MEAL_TYPES, WeeklyMenuPlanner
+
+CUISINES = ['Italian', 'American', 'Indian', 'Chinese', 'Mexican', 'French', 'Japanese', 'Thai']
+
+
+def synthetic_recipes(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(count):
+        meal_types = rng.sample(MEAL_TYPES + ['Dessert'], rng.randint(1, 2))
+        prep = rng.randint(5, 40)
+        cook = rng.randint(0, 120)
+        recipes.append({
+            'id': i + 1,
+            'title': f"Recipe {i + 1}",
+            'cuisine': rng.choice(CUISINES),
+            'prep_time_minutes': prep,
+            'total_time_minutes': prep + cook,
+            'servings': rng.randint(1, 6),
+            'meal_type': meal_types,
+            'ingredients': []
+        })
+    scores = [round(rng.uniform(-1, 1), 3) for _ in range(count)]
+    return recipes, scores
+
+
+def greedy_list_rebuild(recipes, scores):
+    """The original create_weekly_menu selection loop"""
+    recipe_scores = sorted(
+        ({'recipe': recipe, 'score': score} for recipe, score in zip(recipes, scores)),
+        key=lambda x: x['score']
+    )
+    weekly_menu = {}
+    recipe_index = 0
+    for day in DAYS:
+        daily_menu = {}
+        for meal_type in MEAL_TYPES:
+            suitable = [rs for rs in recipe_scores if meal_type in rs['recipe'].get('meal_type', [])]
+            if suitable:
+                chosen = suitable[0]
+                daily_menu[meal_type] = chosen
+                recipe_scores = [rs for rs in recipe_scores if rs['recipe']['id'] != chosen['recipe']['id']]
+            elif recipe_scores:
+                daily_menu[meal_type] = recipe_scores[recipe_index % len(recipe_scores)]
+                recipe_index += 1
+        weekly_menu[day] = daily_menu
+    return weekly_menu
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--recipes', type=int, default=100000)
+    args = parser.parse_args()
+
+    recipes, scores = synthetic_recipes(args.recipes)
+    print(f"{len(recipes)} synthetic recipes")
+
+    legacy = timed(lambda: greedy_list_rebuild(recipes, scores), repeat=1)
+    print(f"Greedy list rebuilds:              {legacy * 1000:9.1f} ms")
+
+    planner = WeeklyMenuPlanner(recipes, scores)
+    print(f"Heap planner:                      {timed(planner.plan) * 1000:9.1f} ms")
+
+    constrained = WeeklyMenuPlanner(recipes, scores, no_repeat_days=3, max_daily_time=120, max_cuisine_per_day=1)
+    print("Heap planner (3-day repeat window,")
+    print(f"  120 min/day, 1 meal per cuisine): {timed(constrained.plan) * 1000:9.1f} ms")
+
+    menu = constrained.plan()
+    for day, meals in menu.items():
+        total_time = sum(meal['total_time'] for meal in meals.values())
+        cuisines = [meal['recipe']['cuisine'] for meal in meals.values()]
+        assert total_time <= 120 and len(set(cuisines)) == len(cuisines), day
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Benchmark suite for the calculator and the Flask endpoints, with JSON output.
+
+Calculator: for each scale (1 = the bundled data, 10/100/1000 = synthetic_data.py output)
+times load_ingredient_inflammation, the matcher index build, find_ingredient_match (cold
+memo), calculate_recipe_inflammation_score, create_weekly_menu (cold: batch scorer and
+score cache rebuilt; warm), top_recipes, a filtered recipe query and generate_shopping_list.
+
+Flask: drives the routes through the test client with OpenAI, BLIP and Places stubbed, so
+the numbers are the app's own overhead. Caches are warm after the first iteration.
+
+Results are written as JSON; pass --compare to print the ratio against an earlier run:
+    python benchmarks/run_suite.py --out bench-new.json --compare bench-old.json
+    python benchmarks/run_suite.py --scales 1 10 --skip-flask
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inflammation_recipe_calculator import InflammationRecipeCalculator
+from synthetic_data import BASE_CSV, BASE_RECIPES, generate
+
+SAMPLE_IMAGE = os.path.join(ROOT, 'static', 'uploads', 'Banana-Single.jpg')
+
+
+def timed(fn, repeat: int, budget_s: float = 10.0, setup=None, per: int = 1):
+    """Run fn up to `repeat` times (at least once, fewer if over budget); times in ms per item"""
+    samples = []
+    spent = 0.0
+    while len(samples) < repeat and (not samples or spent < budget_s):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        samples.append(elapsed * 1000 / per)
+    return {
+        'runs': len(samples),
+        'min_ms': round(min(samples), 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'mean_ms': round(statistics.mean(samples), 4)
+    }
+
+
+# ——— Calculator ———
+def calculator_benchmarks(scale: int, csv_path: str, json_path: str, repeat: int, seed: int = 0):
+    rng = random.Random(seed)
+    results = []
+
+    def record(name, n, timing):
+        results.append(dict(timing, name=name, scale=scale, n=n))
+        print(f"  {scale:5d}x {name:50s} n={n:<7d} median {timing['median_ms']:10.3f} ms")
+
+    calc = InflammationRecipeCalculator(csv_path, json_path, compiled_store_dir=None, verbose=False)
+
+    def load():
+        calc.ingredients_inflammation = {}
+        calc.load_ingredient_inflammation(csv_path)
+    record('load_ingredient_inflammation', len(calc.ingredients_inflammation), timed(load, repeat))
+
+    record('matcher.build_index', len(calc.matcher.names),
+           timed(calc.matcher.build_index, repeat, setup=lambda: setattr(calc.matcher, 'trie', None)))
+
+    queries = [ingredient['name'] for recipe in calc.recipes for ingredient in recipe['ingredients']]
+    queries = rng.sample(queries, min(1000, len(queries)))
+
+    def match_all():
+        for query in queries:
+            calc.find_ingredient_match(query)
+    record('find_ingredient_match (per query)', len(queries),
+           timed(match_all, repeat, setup=calc.matcher.clear_cache, per=len(queries)))
+
+    recipes = rng.sample(calc.recipes, min(1000, len(calc.recipes)))
+
+    def score_all():
+        for recipe in recipes:
+            calc.calculate_recipe_inflammation_score(recipe, 'general')
+    record('calculate_recipe_inflammation_score (per recipe)', len(recipes),
+           timed(score_all, repeat, per=len(recipes)))
+
+    def reset_scorer():
+        # The score cache and rankings hold the scorer too, so a cold run drops all three
+        calc._batch_scorer = None
+        calc._score_cache = None
+        calc._rankings = None
+    record('create_weekly_menu (cold batch scorer)', len(calc.recipes),
+           timed(calc.create_weekly_menu, repeat, setup=reset_scorer))
+    record('create_weekly_menu (warm)', len(calc.recipes), timed(calc.create_weekly_menu, repeat))
+
+    def reset_rankings():
+        calc._rankings = None
+    record('top_recipes (cold rankings)', len(calc.recipes),
+           timed(lambda: calc.top_recipes(meal_type='Dinner'), repeat, setup=reset_rankings))
+    record('top_recipes (warm)', len(calc.recipes), timed(lambda: calc.top_recipes(meal_type='Dinner'), repeat))
+    record('recipe_index.query (3 filters + exclusion)', len(calc.recipes),
+           timed(lambda: calc.get_recipe_index().query(meal_type='Lunch', difficulty='Easy', max_time=45,
+                                                       exclude=['garlic']), repeat))
+
+    menu = calc.create_weekly_menu()
+    record('generate_shopping_list', len(calc.recipes), timed(lambda: calc.generate_shopping_list(menu), repeat))
+    return results
+
+
+# ——— Flask ———
+class _FakeCompletions:
+    """Stands in for chat.completions: canned replies, streamed when asked"""
+
+    def create(self, model, messages, stream=False, **kwargs):
+        if 'gpt-4.1' in model:
+            text = json.dumps({'stores': [{'name': 'Franprix', 'address': '1 Rue', 'price': '€', 'healthiness_score': 60}]})
+        elif kwargs.get('response_format'):
+            text = json.dumps({'detected_food': 'banana', 'ingredients': [{'name': 'banana', 'quantity_grams': 120}],
+                               'total_calories': 105, 'inflammation_level': 'low', 'health_score': 2})
+        else:
+            text = "Eat more leafy greens and oily fish."
+        if stream:
+            return iter(types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=word + ' '))])
+                        for word in text.split())
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text))])
+
+
+class _FakeOpenAI:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions())
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class _FakePlacesResponse:
+    status_code = 200
+
+    def json(self):
+        return {'status': 'OK', 'results': [{'name': f'Store {i}', 'vicinity': f'{i} Rue'} for i in range(5)]}
+
+
+def load_stubbed_app(workdir: str):
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    os.environ['LOG_DB_PATH'] = os.path.join(workdir, 'log.sqlite3')
+    os.environ['ANALYSIS_CACHE_PATH'] = os.path.join(workdir, 'analysis.sqlite3')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # app.py opens the recipe data lazily on the first request, long after the chdir below
+    os.environ['INGREDIENTS_CSV'] = os.path.join(ROOT, os.getenv('INGREDIENTS_CSV', 'ingredients_with_inflammation.csv'))
+    os.environ['RECIPES_JSON'] = os.path.join(ROOT, os.getenv('RECIPES_JSON', 'popular_recipes_database.json'))
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        import app as app_module
+    finally:
+        os.chdir(cwd)
+    fake = _FakeOpenAI()
+    app_module.client = fake
+    app_module.http.openai = lambda api_key=None: fake
+    app_module.http.get = lambda upstream, url, **kwargs: _FakePlacesResponse()
+    app_module.caption_batcher.caption_batch_fn = lambda images: ['a banana on a table'] * len(images)
+    app_module.app.config['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.makedirs(app_module.app.config['UPLOAD_FOLDER'], exist_ok=True)
+    return app_module
+
+
+def flask_benchmarks(repeat: int):
+    results = []
+    with open(SAMPLE_IMAGE, 'rb') as f:
+        image = f.read()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app_module = load_stubbed_app(workdir)
+        client = app_module.app.test_client()
+        client.post('/profile', data={'age': '30', 'diet': 'omnivore'})
+        client.post('/', data={'food': 'banana', 'pain': '2'})
+        with client.session_transaction() as session:
+            session['latitude'], session['longitude'] = '48.85660', '2.35220'
+            user_id = session['user_id']
+        entry_id = app_module.store.latest_entry(user_id)['id']
+
+        routes = [
+            ('GET /', lambda: client.get('/')),
+            ('POST / (no image)', lambda: client.post('/', data={'food': 'oats', 'pain': '3'})),
+            ('POST / (image)', lambda: client.post('/', data={'food': 'banana', 'pain': '2',
+                                                             'image': (io.BytesIO(image), 'meal.jpg')},
+                                                   content_type='multipart/form-data')),
+            ('POST /camera', lambda: client.post('/camera', data={'image': (io.BytesIO(image), 'meal.jpg')},
+                                                 content_type='multipart/form-data')),
+            ('GET /recommendations?stream=0', lambda: client.get('/recommendations?stream=0')),
+            ('GET /recommendations/<id>/stream', lambda: client.get(f'/recommendations/{entry_id}/stream').get_data()),
+            ('GET /locations', lambda: client.get('/locations')),
+            ('POST /api/nearby', lambda: client.post('/api/nearby', json={'lat': 48.8566, 'lng': 2.3522})),
+            ('GET /recommendations?basic=1', lambda: client.get('/recommendations?basic=1')),
+            ('GET /api/recipes', lambda: client.get('/api/recipes?meal_type=Dinner&max_time=60')),
+            ('GET /api/recipes/top', lambda: client.get('/api/recipes/top?meal_type=Dinner&k=5')),
+            ('GET /metrics', lambda: client.get('/metrics')),
+        ]
+        for name, request in routes:
+            request()  # warm up
+            timing = timed(request, repeat)
+            results.append(dict(timing, name=f"flask {name}", scale=1, n=1))
+            print(f"  flask {name:44s} median {timing['median_ms']:10.3f} ms")
+    return results
+
+
+# ——— Runner ———
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path: str):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['name'], r['scale']): r for r in json.load(f)['results']}
+    print(f"\nvs {baseline_path} (median, new / old):")
+    for result in results:
+        old = baseline.get((result['name'], result['scale']))
+        if old and old['median_ms'] > 0:
+            ratio = result['median_ms'] / old['median_ms']
+            print(f"  {result['scale']:5d}x {result['name']:48s} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--data-dir', help="where synthetic data is generated/reused (default: a temp dir)")
+    parser.add_argument('--skip-flask', action='store_true')
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='bench-data-')
+    results = []
+    for scale in args.scales:
+        if scale == 1:
+            csv_path, json_path = BASE_CSV, BASE_RECIPES
+        else:
+            csv_path = os.path.join(data_dir, f"ingredients_{scale}x.csv")
+            json_path = os.path.join(data_dir, f"recipes_{scale}x.json")
+            if not (os.path.exists(csv_path) and os.path.exists(json_path)):
+                csv_path, json_path = generate(scale, data_dir)
+        results.extend(calculator_benchmarks(scale, csv_path, json_path, args.repeat))
+
+    if not args.skip_flask:
+        results.extend(flask_benchmarks(max(args.repeat, 20)))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'scales': args.scales,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Generate synthetic ingredient CSVs and recipe JSONs at a multiple of the bundled data.
+
+Scale N writes N x the rows of ingredients_with_inflammation.csv and N x the recipes of
+popular_recipes_database.json. New ingredient names are variants of real ones ("onion 3"),
+so substring matching behaves like it does on the real data, and synthetic recipes draw
+their ingredients from real and synthetic names (plus some misses). Output is seeded, so
+the same scale always produces the same files.
+
+Run from the repository root:
+    python benchmarks/synthetic_data.py --scale 10 --out /tmp/synthetic
+"""
+import argparse
+import csv
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_CSV = os.path.join(ROOT, 'ingredients_with_inflammation.csv')
+BASE_RECIPES = os.path.join(ROOT, 'popular_recipes_database.json')
+UNITS = ['grams', 'grams', 'grams', 'ml', 'pieces']
+
+
+def read_base() -> Tuple[List[str], List[Dict], Dict]:
+    with open(BASE_CSV, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    with open(BASE_RECIPES, 'r', encoding='utf-8') as f:
+        database = json.load(f)
+    return fieldnames, rows, database
+
+
+def _score(rng: random.Random, missing: float = 0.0) -> str:
+    return '' if rng.random() < missing else f"{rng.uniform(-1, 1):.3f}"
+
+
+def generate(scale: int, out_dir: str, seed: int = 0) -> Tuple[str, str]:
+    """Write ingredients_<scale>x.csv and recipes_<scale>x.json; returns their paths"""
+    rng = random.Random(seed)
+    fieldnames, rows, database = read_base()
+    base_recipes = database['popular_recipes_database']['recipes']
+    base_names = sorted({row['ingredient'] for row in rows})
+
+    # The real rows, then variants of them; duplicate names keep the original's ratio
+    out_rows = list(rows)
+    names = list(base_names)
+    for copy in range(1, scale):
+        for row in rows:
+            name = f"{row['ingredient']} {copy}"
+            out_rows.append({
+                fieldnames[0]: name,
+                fieldnames[1]: _score(rng),
+                fieldnames[2]: _score(rng, missing=0.3),
+                fieldnames[3]: _score(rng, missing=0.3)
+            })
+        names.extend(f"{name} {copy}" for name in base_names)
+
+    recipes = [dict(recipe) for recipe in base_recipes]
+    meal_types = sorted({meal for recipe in base_recipes for meal in recipe.get('meal_type', [])})
+    cuisines = sorted({recipe.get('cuisine', '') for recipe in base_recipes})
+    for recipe_id in range(len(base_recipes) + 1, len(base_recipes) * scale + 1):
+        template = rng.choice(base_recipes)
+        ingredients = []
+        for _ in range(rng.randint(4, 14)):
+            # Mostly known names, some phrased differently, a few unknown
+            roll = rng.random()
+            name = rng.choice(names).lower()
+            if roll < 0.1:
+                name = f"fresh {name}"
+            elif roll < 0.15:
+                name = f"unlisted item {rng.randint(1, 10 ** 6)}"
+            ingredients.append({'name': name, 'quantity': rng.randint(1, 500), 'unit': rng.choice(UNITS)})
+        prep = rng.randint(5, 40)
+        cook = rng.randint(0, 120)
+        recipes.append(dict(
+            template,
+            id=recipe_id,
+            title=f"{template['title']} #{recipe_id}",
+            cuisine=rng.choice(cuisines),
+            prep_time_minutes=prep,
+            cook_time_minutes=cook,
+            total_time_minutes=prep + cook,
+            meal_type=rng.sample(meal_types, rng.randint(1, min(2, len(meal_types)))),
+            ingredients=ingredients
+        ))
+
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, f"ingredients_{scale}x.csv")
+    json_path = os.path.join(out_dir, f"recipes_{scale}x.json")
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(out_rows)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'popular_recipes_database': dict(database['popular_recipes_database'], recipes=recipes)}, f)
+    return csv_path, json_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, nargs='+', default=[10])
+    parser.add_argument('--out', default='synthetic_data')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for scale in args.scale:
+        csv_path, json_path = generate(scale, args.out, args.seed)
+        print(f"{scale}x: {csv_path}, {json_path}")
+
+
+if __name__ == "__main__":
+    main()
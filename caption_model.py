@@ -0,0 +1,78 @@
+import threading
+from typing import List, Optional
+
+MODEL_NAME = "Salesforce/blip-image-captioning-base"
+
+# fp32: full precision on whatever device_map="auto" picks (GPU when present)
+# int8: CPU only, Linear layers dynamically quantized to int8 (weights stored as int8,
+#       activations quantized on the fly); smaller and usually faster on CPU-only boxes
+BACKENDS = ('fp32', 'int8')
+
+
+class CaptionModel:
+    """
+    BLIP captioning model loaded on first use.
+
+    torch and transformers are only imported inside load(), so importing the app (and
+    serving endpoints that never caption) costs neither the import time nor the memory.
+    load() is thread-safe; concurrent first requests wait for a single load.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, backend: str = 'fp32', num_threads: Optional[int] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown caption backend {backend!r}; expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.backend = backend
+        self.num_threads = num_threads
+        self._lock = threading.Lock()
+        self.processor = None
+        self.model = None
+        self.device = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self):
+        if self.model is not None:
+            return
+        with self._lock:
+            if self.model is not None:
+                return
+            import torch
+            from transformers import BlipForConditionalGeneration, BlipProcessor
+
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            processor = BlipProcessor.from_pretrained(self.model_name, use_fast=True)
+            if self.backend == 'int8':
+                model = BlipForConditionalGeneration.from_pretrained(self.model_name)
+                model.eval()
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                model = BlipForConditionalGeneration.from_pretrained(self.model_name, device_map="auto")
+                try:
+                    model = torch.compile(model)
+                except Exception:
+                    pass
+            self.device = next(model.parameters()).device
+            self.processor = processor
+            self.model = model
+
+    def caption_images(self, images: List) -> List[str]:
+        """One processor/generate call for a whole batch of RGB images"""
+        self.load()
+        import torch
+
+        inputs = self.processor(images=images, return_tensors="pt")
+        inputs['pixel_values'] = inputs['pixel_values'].to(self.device)
+        with torch.inference_mode():
+            out = self.model.generate(**inputs, max_length=50)
+        return [self.processor.decode(seq, skip_special_tokens=True) for seq in out]
+
+    def warm_up(self, size: Optional[int] = 384):
+        """Load the model and run one caption so the first real request is not slow"""
+        from PIL import Image
+
+        self.load()
+        self.caption_images([Image.new("RGB", (size, size))])
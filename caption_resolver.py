@@ -0,0 +1,182 @@
+"""
+Local caption -> food analysis, so common foods skip the OpenAI call.
+
+The caption is tokenized and resolved against two indexes built from data already on disk:
+
+    dishes        recipe title tokens -> recipes ("a plate of spaghetti bolognese")
+    ingredients   ingredient names, plural-insensitive, up to 3 words ("a banana on a table")
+
+Confidence is the share of the caption's content words (filler such as "a", "plate",
+"sitting on top of" is ignored) explained by the resolved dish and ingredients. Above
+min_confidence the analysis is built locally, with the inflammation estimate from
+InflammationRecipeCalculator.calculate_recipe_inflammation_score; otherwise analyze()
+returns None and the caller asks the LLM.
+"""
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from ingredient_matcher import singular
+from score_store import GENERAL
+
+# Words that say nothing about what the food is
+STOPWORDS = frozenset("""
+a an the of on in with and or there is are it its this that some to at by for from next near
+over under top front inside sitting standing laying lying placed served topped filled covered
+made close up view picture image photo shot someone person hand hands holding table wooden
+plate plates bowl bowls cup cups glass glasses board cutting kitchen counter background tray
+pan pot dish dishes meal food small large big full piece pieces slice slices sliced cut fresh
+two three four several pile bunch group couple lot lots half whole
+""".split())
+
+MAX_PHRASE_WORDS = 3
+DEFAULT_PORTION_GRAMS = 100
+MIN_CONFIDENCE = 0.75
+# Average inflammation score -> level; scores run roughly from -1 to 1
+LEVELS = ((-0.2, 'low'), (0.2, 'medium'))
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", text.lower())
+
+
+def inflammation_level(score: float) -> str:
+    for bound, level in LEVELS:
+        if score < bound:
+            return level
+    return 'high'
+
+
+class CaptionResolver:
+    """Resolve captions against recipe titles and ingredient names of one calculator"""
+
+    def __init__(self, calc, min_confidence: float = MIN_CONFIDENCE, person: str = GENERAL):
+        self.calc = calc
+        self.min_confidence = min_confidence
+        self.person = person
+
+        # Normalized phrase -> database ingredient (first in load order)
+        self.ingredients: Dict[Tuple[str, ...], str] = {}
+        for name in calc.score_store.names:
+            words = tuple(singular(word) for word in tokenize(name))
+            if 0 < len(words) <= MAX_PHRASE_WORDS:
+                self.ingredients.setdefault(words, name)
+
+        # Title token -> recipe rows; titles keep their content words only
+        self.titles: List[Set[str]] = []
+        self.title_rows: Dict[str, List[int]] = {}
+        for row, recipe in enumerate(calc.recipes):
+            words = {singular(word) for word in tokenize(recipe['title'])
+                     if word not in STOPWORDS and singular(word) not in STOPWORDS}
+            self.titles.append(words)
+            for word in words:
+                self.title_rows.setdefault(word, []).append(row)
+
+        self.local = 0
+        self.fallback = 0
+        self._lock = threading.Lock()
+
+    def _match_ingredients(self, words: List[str], stop: List[bool]) -> Tuple[List[str], Set[int]]:
+        """Longest-first, non-overlapping phrase matches; returns the names and the word positions used"""
+        found = []
+        used: Set[int] = set()
+        for length in range(MAX_PHRASE_WORDS, 0, -1):
+            for start in range(len(words) - length + 1):
+                span = set(range(start, start + length))
+                if span & used:
+                    continue
+                phrase = tuple(words[start:start + length])
+                if length == 1 and stop[start]:
+                    continue
+                name = self.ingredients.get(phrase)
+                if name is not None:
+                    found.append(name)
+                    used |= span
+        return found, used
+
+    def _match_dish(self, content: Set[str]) -> Optional[int]:
+        """First recipe whose title words all appear in the caption (most title words wins)"""
+        best = None
+        best_size = 0
+        seen = set()
+        for word in content:
+            for row in self.title_rows.get(word, []):
+                if row in seen:
+                    continue
+                seen.add(row)
+                title = self.titles[row]
+                if title <= content and (len(title) > best_size or (len(title) == best_size and row < best)):
+                    best, best_size = row, len(title)
+        return best
+
+    def resolve(self, caption: str) -> Dict:
+        """Dish, ingredients (name -> grams) and confidence, whether or not it is high enough"""
+        raw = tokenize(caption)
+        words = [singular(word) for word in raw]
+        stop = [word in STOPWORDS or normal in STOPWORDS for word, normal in zip(raw, words)]
+        content = {word for word, is_stop in zip(words, stop) if not is_stop}
+
+        names, used = self._match_ingredients(words, stop)
+        dish = self._match_dish(content)
+        explained = {words[i] for i in used}
+
+        ingredients: Dict[str, float] = {}
+        if dish is not None:
+            recipe = self.calc.recipes[dish]
+            explained |= self.titles[dish]
+            servings = recipe.get('servings') or 1
+            for ingredient in recipe['ingredients']:
+                ingredients[ingredient['name']] = ingredient['quantity'] / servings
+        for name in names:
+            ingredients.setdefault(name, DEFAULT_PORTION_GRAMS)
+
+        confidence = len(content & explained) / len(content) if content else 0.0
+        return {
+            'dish': dish,
+            'detected_food': self.calc.recipes[dish]['title'] if dish is not None else ', '.join(names),
+            'ingredients': ingredients,
+            'confidence': round(confidence, 3)
+        }
+
+    def analyze(self, caption: str) -> Optional[Dict]:
+        """A food analysis in the LLM's format, or None when the caption isn't understood well enough"""
+        resolved = self.resolve(caption)
+        if not resolved['ingredients'] or resolved['confidence'] < self.min_confidence:
+            with self._lock:
+                self.fallback += 1
+            return None
+
+        scored = self.calc.calculate_recipe_inflammation_score({
+            'id': None,
+            'title': resolved['detected_food'],
+            'ingredients': [{'name': name, 'quantity': grams} for name, grams in resolved['ingredients'].items()]
+        }, self.person)
+        if not scored['matched_ingredients']:
+            with self._lock:
+                self.fallback += 1
+            return None
+
+        score = scored['average_inflammation_score']
+        with self._lock:
+            self.local += 1
+        return {
+            'detected_food': resolved['detected_food'],
+            'ingredients': [
+                {'name': name, 'quantity_grams': round(grams)} for name, grams in resolved['ingredients'].items()
+            ],
+            'inflammation_level': inflammation_level(score),
+            'inflammation_score': score,
+            'health_score': max(-3, min(3, round(-score * 3))),
+            'confidence': resolved['confidence'],
+            'source': 'local'
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.local + self.fallback
+            return {
+                'local': self.local,
+                'fallback': self.fallback,
+                'local_rate': round(self.local / total, 3) if total else None,
+                'min_confidence': self.min_confidence
+            }
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+class CaptionBatcher:
+    """
+    Micro-batch caption requests onto one worker thread.
+
+    Request threads call submit(image) and get a Future. The worker takes the first pending
+    image, keeps collecting until max_batch_size images are queued or max_wait_ms has passed,
+    then captions the whole batch with a single caption_batch_fn(images) call.
+    """
+
+    def __init__(self, caption_batch_fn: Callable[[List], List[str]], max_batch_size: int = 8,
+                 max_wait_ms: float = 20):
+        self.caption_batch_fn = caption_batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+        self.batches = 0
+        self.images = 0
+        self.failures = 0
+        self.max_seen_batch = 0
+        self.batch_size_counts: Dict[int, int] = {}
+        self.inference_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='caption-batcher', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Finish the queued work and stop the worker"""
+        self._stopping = True
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, image) -> Future:
+        """Queue an RGB PIL image; the future resolves to its caption"""
+        self.start()
+        future: Future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def caption(self, image, timeout: Optional[float] = None) -> str:
+        return self.submit(image).result(timeout)
+
+    def _collect(self) -> List:
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopping = True
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._process(batch)
+            if self._stopping and self._queue.empty():
+                return
+
+    def _process(self, batch: List):
+        # Skip requests whose caller already gave up
+        batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            captions = list(self.caption_batch_fn([image for image, _ in batch]))
+        except Exception as e:
+            self.failures += len(batch)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self.inference_seconds += time.perf_counter() - start
+
+        self.batches += 1
+        self.images += len(batch)
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+        for (_, future), caption in zip(batch, captions):
+            future.set_result(caption)
+        # A short result must not leave callers waiting forever
+        if len(captions) < len(batch):
+            self.failures += len(batch) - len(captions)
+            error = RuntimeError(f"caption_batch_fn returned {len(captions)} captions for {len(batch)} images")
+            for _, future in batch[len(captions):]:
+                future.set_exception(error)
+
+    def metrics(self) -> Dict:
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': self.batches,
+            'images': self.images,
+            'failures': self.failures,
+            'average_batch_size': round(self.images / self.batches, 2) if self.batches else 0,
+            'max_batch_size_seen': self.max_seen_batch,
+            'batch_size_counts': dict(sorted(self.batch_size_counts.items())),
+            'inference_seconds': round(self.inference_seconds, 3),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
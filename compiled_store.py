@@ -0,0 +1,141 @@
+"""
+Compiled, memory-mappable copy of the ingredient inflammation table and recipe database.
+
+    python compiled_store.py [--out compiled_store]
+
+writes plain .npy arrays (loadable with mmap_mode='r', so worker processes share the pages)
+plus a small JSON manifest. InflammationRecipeCalculator uses the store when its manifest
+was compiled from the same source files and is newer than both, and parses the CSV/JSON otherwise.
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from batch_scorer import BatchScorer
+from score_store import ScoreStore
+
+DEFAULT_STORE_DIR = 'compiled_store'
+STORE_VERSION = 2
+MANIFEST = 'manifest.json'
+ARRAYS = ['names', 'general', 'override_indptr', 'override_indices', 'override_values',
+          'entry_recipes', 'entry_ingredients', 'entry_weights', 'ingredient_counts']
+
+
+class CompiledStore:
+    """Arrays and metadata loaded from a compiled store directory"""
+
+    def __init__(self, store_dir: str, manifest: Dict, arrays: Dict[str, np.ndarray], recipes: List[Dict]):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.names = arrays['names'].tolist()
+        self.recipes = recipes
+        # The mmap'd general column is shared read-only; overrides start as views of the CSR arrays
+        self.score_store = ScoreStore.from_csr(
+            self.names, arrays['general'], manifest['users'],
+            arrays['override_indptr'], arrays['override_indices'], arrays['override_values']
+        )
+        self.ingredients_inflammation = self.score_store.table()
+        self.arrays = arrays
+
+    @property
+    def people(self) -> List[str]:
+        return self.score_store.people()
+
+    def batch_scorer(self) -> BatchScorer:
+        return BatchScorer(
+            [recipe['id'] for recipe in self.recipes],
+            self.score_store,
+            self.arrays['entry_recipes'],
+            self.arrays['entry_ingredients'],
+            self.arrays['entry_weights'],
+            self.arrays['ingredient_counts']
+        )
+
+
+def is_fresh(store_dir: str, sources: Sequence[str]) -> bool:
+    """True if the store exists, matches STORE_VERSION, was built from sources and is newer than each of them"""
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    try:
+        store_mtime = os.path.getmtime(manifest_path)
+        source_mtime = max(os.path.getmtime(path) for path in sources)
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get('version') == STORE_VERSION
+            and manifest.get('sources') == [os.path.abspath(path) for path in sources]
+            and store_mtime >= source_mtime)
+
+
+def write_store(store_dir: str, score_store: ScoreStore, recipes: List[Dict],
+                scorer: BatchScorer, sources: Sequence[str]):
+    """Write the compiled arrays; the manifest goes last so readers never see a partial store"""
+    os.makedirs(store_dir, exist_ok=True)
+    names = score_store.names
+    users, indptr, indices, values = score_store.to_csr()
+    arrays = {
+        'names': np.array(names, dtype=str) if names else np.array([], dtype='<U1'),
+        'general': score_store.general,
+        'override_indptr': indptr,
+        'override_indices': indices,
+        'override_values': values,
+        'entry_recipes': scorer.entry_recipes,
+        'entry_ingredients': scorer.entry_ingredients,
+        'entry_weights': scorer.entry_weights,
+        'ingredient_counts': scorer.ingredient_counts
+    }
+    for name, array in arrays.items():
+        path = os.path.join(store_dir, f"{name}.npy")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.save(file, np.ascontiguousarray(array))
+        os.replace(tmp_path, path)
+
+    recipes_path = os.path.join(store_dir, 'recipes.json')
+    with open(recipes_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(recipes, file, ensure_ascii=False, separators=(',', ':'))
+    os.replace(recipes_path + '.tmp', recipes_path)
+
+    manifest = {
+        'version': STORE_VERSION,
+        'users': users,
+        'sources': [os.path.abspath(path) for path in sources],
+        'ingredients': len(names),
+        'overrides': len(values),
+        'recipes': len(recipes)
+    }
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def load_store(store_dir: str) -> CompiledStore:
+    """Memory-map a compiled store"""
+    with open(os.path.join(store_dir, MANIFEST), 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    arrays = {name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode='r') for name in ARRAYS}
+    with open(os.path.join(store_dir, 'recipes.json'), 'r', encoding='utf-8') as file:
+        recipes = json.load(file)
+    return CompiledStore(store_dir, manifest, arrays, recipes)
+
+
+def main():
+    from inflammation_recipe_calculator import InflammationRecipeCalculator
+
+    parser = argparse.ArgumentParser(description="Compile the ingredient and recipe data into a mmap-able store")
+    parser.add_argument('--ingredients', default='ingredients_with_inflammation.csv')
+    parser.add_argument('--recipes', default='popular_recipes_database.json')
+    parser.add_argument('--out', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+
+    calc = InflammationRecipeCalculator(args.ingredients, args.recipes, compiled_store_dir=None)
+    calc.compile_store(args.out)
+    print(f"Compiled {len(calc.ingredients_inflammation)} ingredients and {len(calc.recipes)} recipes into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Store-lookup cache keyed on a geohash cell and search radius.
+
+Users in the same neighbourhood share a cell, so they share one upstream answer until it
+expires. Concurrent misses for the same cell are coalesced (single flight): one caller
+fetches, the rest wait for its result.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat: float, lon: float, precision: int = 6) -> str:
+    """Standard base32 geohash; precision 6 is a cell of roughly 1.2 km x 0.6 km"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def parse_coordinates(lat, lon) -> Optional[Tuple[float, float]]:
+    try:
+        return float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+
+
+class GeoCache:
+    """TTL + LRU cache of store lookups per (namespace, geohash cell, radius)"""
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 4096, precision: int = 6):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.precision = precision
+        self._data: OrderedDict = OrderedDict()
+        self._in_flight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'coalesced': 0, 'evictions': 0, 'errors': 0}
+
+    def key(self, namespace: str, lat, lon, radius: int = 0) -> Tuple:
+        coordinates = parse_coordinates(lat, lon)
+        cell = geohash(*coordinates, self.precision) if coordinates else 'unknown'
+        return (namespace, cell, radius)
+
+    def get_or_fetch(self, namespace: str, lat, lon, radius: int, fetch: Callable[[], Any],
+                     cache_if: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Cached value for the cell, or the result of fetch() (run once per cell at a time)"""
+        key = self.key(namespace, lat, lon, radius)
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is not None:
+                expires_at, value = cached
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return value
+                del self._data[key]
+                self.counters['expired'] += 1
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.counters['coalesced'] += 1
+                leader = False
+            else:
+                future = self._in_flight[key] = Future()
+                self.counters['misses'] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self.counters['errors'] += 1
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if cache_if(value):
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+                    self.counters['evictions'] += 1
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters, entries=len(self._data), in_flight=len(self._in_flight),
+                        ttl_seconds=self.ttl, precision=self.precision)
@@ -0,0 +1,133 @@
+"""
+Process-wide pooled clients for upstream APIs.
+
+One requests.Session (keep-alive pool, bounded retries with jittered exponential backoff,
+default timeouts) and one OpenAI client per API key, plus a concurrency limit per upstream
+so a slow dependency can't take every worker thread.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT: Tuple[float, float] = (
+    float(os.getenv('HTTP_CONNECT_TIMEOUT', '3')),
+    float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+)
+DEFAULT_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+DEFAULT_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
+DEFAULT_UPSTREAM_CONCURRENCY = int(os.getenv('UPSTREAM_CONCURRENCY', '16'))
+
+
+class UpstreamLimiter:
+    """One bounded semaphore per upstream name"""
+
+    def __init__(self, default_limit: int = DEFAULT_UPSTREAM_CONCURRENCY, limits: Optional[Dict[str, int]] = None):
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.in_flight: Dict[str, int] = {}
+
+    def _semaphore(self, upstream: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if upstream not in self._semaphores:
+                limit = self.limits.get(upstream, self.default_limit)
+                self._semaphores[upstream] = threading.BoundedSemaphore(limit)
+                self.in_flight[upstream] = 0
+            return self._semaphores[upstream]
+
+    @contextmanager
+    def limit(self, upstream: str):
+        semaphore = self._semaphore(upstream)
+        with semaphore:
+            with self._lock:
+                self.in_flight[upstream] += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight[upstream] -= 1
+
+
+def build_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+                  backoff_factor: float = 0.2, backoff_jitter: float = 0.1) -> requests.Session:
+    """Session with a keep-alive pool and idempotent-request retries (429/5xx, connection errors)"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class HTTPClients:
+    """Shared session and OpenAI clients with per-upstream concurrency limits"""
+
+    def __init__(self, session: Optional[requests.Session] = None, timeout=DEFAULT_TIMEOUT,
+                 limiter: Optional[UpstreamLimiter] = None, openai_timeout: float = 30, openai_retries: int = 2):
+        self.session = session or build_session()
+        self.timeout = timeout
+        self.limiter = limiter or UpstreamLimiter()
+        self.openai_timeout = openai_timeout
+        self.openai_retries = openai_retries
+        self._openai_clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, upstream: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        with self.limiter.limit(upstream):
+            return self.session.get(url, **kwargs)
+
+    def openai(self, api_key: Optional[str] = None):
+        """One OpenAI client (and so one connection pool) per API key"""
+        from openai import OpenAI
+
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        with self._lock:
+            client = self._openai_clients.get(api_key)
+            if client is None:
+                client = OpenAI(api_key=api_key, timeout=self.openai_timeout, max_retries=self.openai_retries)
+                self._openai_clients[api_key] = client
+            return client
+
+    @contextmanager
+    def limit(self, upstream: str):
+        with self.limiter.limit(upstream):
+            yield
+
+
+_clients: Optional[HTTPClients] = None
+_clients_lock = threading.Lock()
+
+
+def get_clients() -> HTTPClients:
+    """The process-wide HTTPClients instance"""
+    global _clients
+    if _clients is None:
+        with _clients_lock:
+            if _clients is None:
+                _clients = HTTPClients(
+                    openai_timeout=float(os.getenv('OPENAI_TIMEOUT', '30')),
+                    openai_retries=int(os.getenv('OPENAI_RETRIES', '2')),
+                    limiter=UpstreamLimiter(limits={
+                        'openai': int(os.getenv('OPENAI_CONCURRENCY', str(DEFAULT_UPSTREAM_CONCURRENCY))),
+                        'places': int(os.getenv('PLACES_CONCURRENCY', str(DEFAULT_UPSTREAM_CONCURRENCY)))
+                    })
+                )
+    return _clients
@@ -0,0 +1,62 @@
+"""
+Upload ingest: decode a photo once, at (close to) model resolution.
+
+JPEG draft mode lets the decoder skip most of a 12 MP phone photo, Image.reduce() does the
+remaining integer downscale cheaply, and the caption model gets the in-memory RGB image
+directly. Only a compressed thumbnail is written to disk, named by the content hash, so
+identical uploads share one file and different uploads never overwrite each other.
+"""
+import io
+import os
+from typing import NamedTuple
+
+from PIL import Image, ImageOps
+
+from analysis_cache import content_hash
+
+MODEL_SIZE = 384
+THUMBNAIL_SIZE = 512
+THUMBNAIL_QUALITY = 80
+
+
+class IngestedImage(NamedTuple):
+    digest: str
+    filename: str
+    path: str
+    image: Image.Image  # RGB, MODEL_SIZE x MODEL_SIZE
+
+
+def decode(data: bytes, min_side: int) -> Image.Image:
+    """Decode to RGB with both sides >= min_side (when the source is that large)"""
+    image = Image.open(io.BytesIO(data))
+    # JPEG only: decode at 1/2, 1/4 or 1/8 scale while staying >= the requested size
+    image.draft('RGB', (min_side, min_side))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    factor = min(image.size) // min_side
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image
+
+
+def write_thumbnail(image: Image.Image, path: str, size: int = THUMBNAIL_SIZE,
+                    quality: int = THUMBNAIL_QUALITY):
+    thumbnail = image.copy()
+    thumbnail.thumbnail((size, size), Image.LANCZOS)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    thumbnail.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+    os.replace(tmp_path, path)
+
+
+def ingest(data: bytes, upload_dir: str, model_size: int = MODEL_SIZE,
+           thumbnail_size: int = THUMBNAIL_SIZE) -> IngestedImage:
+    """Hash, decode once, store the thumbnail (unless already stored) and return the model input"""
+    digest = content_hash(data)
+    filename = f"{digest[:32]}.jpg"
+    path = os.path.join(upload_dir, filename)
+
+    image = decode(data, min(model_size, thumbnail_size))
+    if not os.path.exists(path):
+        write_thumbnail(image, path, thumbnail_size)
+    # BLIP's processor resizes to a fixed square; doing it here makes its resize a no-op
+    model_image = image.resize((model_size, model_size), Image.BICUBIC)
+    return IngestedImage(digest, filename, path, model_image)
@@ -1,7 +1,18 @@
 import csv
 import json
 import random
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from batch_scorer import BatchScorer, BatchScores
+from compiled_store import DEFAULT_STORE_DIR, is_fresh, load_store, write_store
+from ingredient_matcher import IngredientMatcher
+from menu_planner import DAYS, WeeklyMenuPlanner
+from recipe_index import RecipeIndex
+from recipe_rankings import MAXIMIZE, MINIMIZE, RecipeRankings
+from rescoring import MenuRegistry, RecipeScoreCache, TrackedMenu
+from score_store import GENERAL, ScoreStore, load_rows
+from shopping_list import ShoppingListAggregator
 
 class InflammationRecipeCalculator:
     """
@@ -9,30 +20,55 @@ class InflammationRecipeCalculator:
     """
     
     def __init__(self, ingredients_csv_path: str = 'ingredients_with_inflammation.csv', 
-                 recipes_json_path: str = 'popular_recipes_database.json'):
-        self.ingredients_inflammation = {}
+                 recipes_json_path: str = 'popular_recipes_database.json',
+                 compiled_store_dir: Optional[str] = DEFAULT_STORE_DIR, verbose: bool = True):
+        self.ingredients_csv_path = ingredients_csv_path
+        self.recipes_json_path = recipes_json_path
+        self.verbose = verbose
+        self.score_store = ScoreStore.from_table({})
+        self.ingredients_inflammation = self.score_store.table()
         self.recipes = []
-        self.load_ingredient_inflammation(ingredients_csv_path)
-        self.load_recipes(recipes_json_path)
+        self.matcher = IngredientMatcher([])
+        self._batch_scorer = None
+        self._score_cache = None
+        self._recipe_index = None
+        self._rankings = None
+        self._update_lock = threading.Lock()
+        # Menus planned with a menu_id, re-planned by replan_stale_menus after score changes
+        self.menus = MenuRegistry()
+        
+        # Use the compiled store when it was built from these sources and is newer, otherwise parse them
+        if compiled_store_dir and is_fresh(compiled_store_dir, [ingredients_csv_path, recipes_json_path]):
+            self.load_compiled_store(compiled_store_dir)
+        else:
+            self.load_ingredient_inflammation(ingredients_csv_path)
+            self.load_recipes(recipes_json_path)
+    
+    def log(self, message: str):
+        """Print progress messages unless the calculator was created with verbose=False"""
+        if self.verbose:
+            print(message)
     
     def load_ingredient_inflammation(self, csv_path: str):
-        """Load ingredient inflammation scores from CSV file"""
+        """
+        Load ingredient inflammation scores from CSV file.
+        Every '<person> inflammation' column after the ingredient one is a person; the
+        'general people' column is the baseline and the others become sparse overrides.
+        """
         try:
             with open(csv_path, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
-                for row in reader:
-                    ingredient = row['ingredient'].lower().strip()
-                    self.ingredients_inflammation[ingredient] = {
-                        'general': float(row['general people inflammation']) if row['general people inflammation'] else None,
-                        'sam': float(row['Sam inflammation']) if row['Sam inflammation'] else None,
-                        'andrea': float(row['Andrea inflammation']) if row['Andrea inflammation'] else None
-                    }
-            print(f"Loaded inflammation data for {len(self.ingredients_inflammation)} ingredients")
+                table = load_rows(reader, reader.fieldnames)
+            self.log(f"Loaded inflammation data for {len(table)} ingredients")
         except FileNotFoundError:
-            print(f"Warning: {csv_path} not found. Creating sample data...")
-            self.create_sample_inflammation_data()
+            self.log(f"Warning: {csv_path} not found. Creating sample data...")
+            table = self.create_sample_inflammation_data()
+        self.score_store = ScoreStore.from_table(table)
+        self.ingredients_inflammation = self.score_store.table()
+        self.matcher = IngredientMatcher(self.score_store.names)
+        self._reset_scores()
     
-    def create_sample_inflammation_data(self):
+    def create_sample_inflammation_data(self) -> Dict[str, Dict[str, Optional[float]]]:
         """Create sample inflammation data if the CSV file doesn't exist"""
         common_ingredients = [
             'spaghetti', 'ground beef', 'onion', 'carrot', 'celery', 'garlic', 'tomatoes',
@@ -48,12 +84,14 @@ class InflammationRecipeCalculator:
             'parsley'
         ]
         
-        for ingredient in common_ingredients:
-            self.ingredients_inflammation[ingredient] = {
+        return {
+            ingredient: {
                 'general': round(random.uniform(-1, 1), 3),
                 'sam': round(random.uniform(-1, 1), 3) if random.choice([True, False]) else None,
                 'andrea': round(random.uniform(-1, 1), 3) if random.choice([True, False]) else None
             }
+            for ingredient in common_ingredients
+        }
     
     def load_recipes(self, json_path: str):
         """Load recipes from JSON file"""
@@ -61,50 +99,123 @@ class InflammationRecipeCalculator:
             with open(json_path, 'r', encoding='utf-8') as file:
                 data = json.load(file)
                 self.recipes = data['popular_recipes_database']['recipes']
-            print(f"Loaded {len(self.recipes)} recipes")
+            self.log(f"Loaded {len(self.recipes)} recipes")
         except FileNotFoundError:
-            print(f"Warning: {json_path} not found. No recipes loaded.")
+            self.log(f"Warning: {json_path} not found. No recipes loaded.")
             self.recipes = []
+        self._reset_scores()
+    
+    def load_compiled_store(self, store_dir: str):
+        """Load inflammation data and recipes from a compiled store (arrays are memory-mapped)"""
+        store = load_store(store_dir)
+        self.score_store = store.score_store
+        self.ingredients_inflammation = store.ingredients_inflammation
+        self.recipes = store.recipes
+        self.matcher = IngredientMatcher(store.names)
+        self._reset_scores()
+        self._batch_scorer = store.batch_scorer()
+        self.log(f"Loaded {len(self.ingredients_inflammation)} ingredients and "
+                 f"{len(self.recipes)} recipes from {store_dir}")
+    
+    def _reset_scores(self):
+        """Drop everything derived from the data; every tracked menu needs re-planning"""
+        self._batch_scorer = None
+        self._score_cache = None
+        self._recipe_index = None
+        self._rankings = None
+        self.menus.mark_all_stale()
+    
+    def compile_store(self, store_dir: str = DEFAULT_STORE_DIR):
+        """Write the loaded data as a compiled store for fast startup"""
+        write_store(store_dir, self.score_store, self.recipes, self.get_batch_scorer(),
+                    [self.ingredients_csv_path, self.recipes_json_path])
+    
+    @property
+    def people(self) -> List[str]:
+        """'general' followed by every user with score overrides"""
+        return self.score_store.people()
+    
+    def _match_names(self, scores: Dict[str, float]) -> Dict[str, float]:
+        """Map score names to database ingredients like recipe ingredients; KeyError if one has no match"""
+        matched = {}
+        for name, score in scores.items():
+            ingredient = self.find_ingredient_match(name)
+            if ingredient is None:
+                raise KeyError(f"No ingredient matches '{name}'")
+            matched[ingredient] = score
+        return matched
+    
+    def _rescore(self, person: str, change) -> Dict:
+        """Apply change() to the score store, then rescore only the recipes it touched"""
+        with self._update_lock:
+            before = self.score_store.version
+            rows = change()
+            if self._score_cache is None:
+                return {'version': self.score_store.version, 'changed': {}, 'stale_menus': []}
+            changes = self._score_cache.refresh(person, rows, before)
+            stale = self.menus.mark_changed(person, changes)
+            if self._rankings is not None:
+                self._rankings.apply_changes(person, changes, before)
+        recipe_ids = self._score_cache.scorer.recipe_ids
+        return {
+            'version': self.score_store.version,
+            'changed': {name: [recipe_ids[row] for row in moved] for name, moved in changes.items() if moved},
+            'stale_menus': stale
+        }
+    
+    def update_scores(self, person: str, scores: Dict[str, float]) -> Dict:
+        """
+        Change some ingredient scores for one person ('general' changes the baseline everyone
+        without an override uses). Only recipes using those ingredients are rescored; returns
+        the recipe IDs whose average moved per person and the tracked menus now stale.
+        """
+        matched = self._match_names(scores)
+        if person == GENERAL:
+            return self._rescore(person, lambda: self.score_store.set_general(matched))
+        return self._rescore(person, lambda: self.score_store.update_user(person, matched))
+    
+    def add_user(self, user: str, scores: Dict[str, float], replace: bool = True) -> Dict:
+        """
+        Add a user (or change one) at runtime: scores maps ingredient -> score and only
+        needs the ingredients where the user differs from the general score.
+        Names are matched like recipe ingredients; a name with no match raises KeyError.
+        """
+        if not replace:
+            return self.update_scores(user, scores)
+        matched = self._match_names(scores)
+        return self._rescore(user, lambda: self.score_store.set_user(user, matched))
+    
+    def remove_user(self, user: str) -> bool:
+        """Drop a user's overrides; they are scored with the general data afterwards"""
+        if user == GENERAL or not self.score_store.has_user(user):
+            return False
+        rows = self.score_store.override_rows(user)
+        self._rescore(user, lambda: rows if self.score_store.remove_user(user) else rows[:0])
+        return True
+    
+    def stale_menus(self) -> List[str]:
+        """IDs of tracked menus whose scores changed since they were planned"""
+        return self.menus.stale()
+    
+    def replan_stale_menus(self, menu_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Re-plan stale tracked menus (all of them, or the given IDs) with their original options"""
+        replanned = {}
+        for menu_id in (self.menus.stale() if menu_ids is None else menu_ids):
+            menu = self.menus.get(menu_id)
+            if menu is not None and menu.stale:
+                replanned[menu_id] = self.create_weekly_menu(menu.person, menu_id=menu_id, **menu.options)
+        return replanned
     
     def find_ingredient_match(self, recipe_ingredient: str) -> Optional[str]:
         """
         Try to find a matching ingredient in the inflammation database
         """
-        recipe_ingredient = recipe_ingredient.lower().strip()
-        
-        # Direct match
-        if recipe_ingredient in self.ingredients_inflammation:
-            return recipe_ingredient
-        
-        # Check for partial matches
-        for db_ingredient in self.ingredients_inflammation.keys():
-            if recipe_ingredient in db_ingredient or db_ingredient in recipe_ingredient:
-                return db_ingredient
-        
-        # Check for common ingredient mappings
-        ingredient_mappings = {
-            'ground beef': 'beef',
-            'chicken breast': 'chicken',
-            'all-purpose flour': 'flour',
-            'canned tomatoes': 'tomatoes',
-            'fresh basil': 'basil',
-            'romaine lettuce': 'lettuce',
-            'hamburger buns': 'bread',
-            'egg noodles': 'pasta',
-            'heavy cream': 'cream',
-            'vegetable oil': 'oil'
-        }
-        
-        if recipe_ingredient in ingredient_mappings:
-            mapped_ingredient = ingredient_mappings[recipe_ingredient]
-            if mapped_ingredient in self.ingredients_inflammation:
-                return mapped_ingredient
-        
-        return None
+        return self.matcher.match(recipe_ingredient)
     
     def calculate_recipe_inflammation_score(self, recipe: Dict, person: str = 'general') -> Dict:
         """
         Calculate inflammation score for a recipe for a specific person
+        (their override where they have one, the general score otherwise)
         """
         total_score = 0.0
         matched_ingredients = 0
@@ -158,76 +269,91 @@ class InflammationRecipeCalculator:
     
     def get_recipe_scores_for_all_people(self, recipe: Dict) -> Dict:
         """Get inflammation scores for a recipe for all people"""
-        return {
-            'general': self.calculate_recipe_inflammation_score(recipe, 'general'),
-            'sam': self.calculate_recipe_inflammation_score(recipe, 'sam'),
-            'andrea': self.calculate_recipe_inflammation_score(recipe, 'andrea')
-        }
+        return {person: self.calculate_recipe_inflammation_score(recipe, person) for person in self.people}
+    
+    def get_batch_scorer(self) -> BatchScorer:
+        """Compiled recipe/ingredient matrices, rebuilt after the data is reloaded"""
+        if self._batch_scorer is None:
+            self._batch_scorer = BatchScorer.compile(self.recipes, self.score_store, self.matcher)
+        return self._batch_scorer
+    
+    def get_recipe_index(self) -> RecipeIndex:
+        """Bitset indexes for filtering recipes, rebuilt after the data is reloaded"""
+        if self._recipe_index is None:
+            self._recipe_index = RecipeIndex(self.recipes)
+        return self._recipe_index
+    
+    def find_recipes(self, **filters) -> List[Dict]:
+        """Recipes passing every filter (meal_type, cuisine, difficulty, category, max_time, min_time, exclude)"""
+        return [self.recipes[row] for row in self.get_recipe_index().search(**filters)]
+    
+    def get_score_cache(self) -> RecipeScoreCache:
+        """Per-person recipe averages, kept current by update_scores/add_user/remove_user"""
+        if self._score_cache is None:
+            self._score_cache = RecipeScoreCache(self.get_batch_scorer())
+        return self._score_cache
+    
+    def get_rankings(self) -> RecipeRankings:
+        """Cached top-k lists per (person, meal type, objective), refreshed on score changes"""
+        if self._rankings is None:
+            self._rankings = RecipeRankings(self.get_score_cache(), self.get_recipe_index())
+        return self._rankings
+    
+    def top_recipes(self, person: str = 'general', meal_type: Optional[str] = None, k: int = 5,
+                    minimize_inflammation: bool = True, exclude_ingredients: Sequence[str] = ()) -> List[Dict]:
+        """
+        The k best recipes for person (of one meal type, or any), each as
+        {'recipe': ..., 'inflammation_score': ...}; served from the cached rankings
+        """
+        objective = MINIMIZE if minimize_inflammation else MAXIMIZE
+        ranked = self.get_rankings().top(person, meal_type, k, objective, exclude_ingredients)
+        return [{'recipe': self.recipes[row], 'inflammation_score': score} for row, score in ranked]
+    
+    def batch_score_recipes(self, people: Optional[List[str]] = None) -> BatchScores:
+        """
+        Score every recipe for every person in one vectorized pass.
+        Use calculate_recipe_inflammation_score for the per-ingredient details of a single recipe.
+        """
+        return self.get_batch_scorer().score_all(people)
     
-    def create_weekly_menu(self, person: str = 'general', minimize_inflammation: bool = True) -> Dict:
+    def create_weekly_menu(self, person: str = 'general', minimize_inflammation: bool = True,
+                           no_repeat_days: int = 7, max_daily_time: Optional[int] = None,
+                           max_cuisine_per_day: Optional[int] = None, menu_id: Optional[str] = None,
+                           exclude_ingredients: Sequence[str] = (), cuisine: Optional[Sequence[str]] = None,
+                           difficulty: Optional[Sequence[str]] = None, max_recipe_time: Optional[int] = None) -> Dict:
         """
-        Create a weekly menu (7 days, 3 meals per day) optimized for inflammation scores
+        Create a weekly menu (7 days, 3 meals per day) optimized for inflammation scores.
+        no_repeat_days, max_daily_time (minutes) and max_cuisine_per_day constrain the plan,
+        see WeeklyMenuPlanner; slots nothing can fill within them are left empty and listed
+        in 'unfilled_slots'. Only recipes passing the recipe filters are candidates:
+        exclude_ingredients (allergies: ingredient words or groups, see RecipeIndex), cuisine,
+        difficulty and max_recipe_time (minutes per recipe).
+        With a menu_id the menu is tracked, so later score changes can report it as stale
+        (see update_scores and replan_stale_menus).
         """
         if not self.recipes:
             return {"error": "No recipes loaded"}
         
-        # Calculate inflammation scores for all recipes
-        recipe_scores = []
-        for recipe in self.recipes:
-            score_data = self.calculate_recipe_inflammation_score(recipe, person)
-            recipe_scores.append({
-                'recipe': recipe,
-                'score_data': score_data
-            })
-        
-        # Sort recipes by inflammation score (ascending for minimizing inflammation)
-        if minimize_inflammation:
-            recipe_scores.sort(key=lambda x: x['score_data']['average_inflammation_score'])
-        else:
-            recipe_scores.sort(key=lambda x: x['score_data']['average_inflammation_score'], reverse=True)
+        candidates = self.get_recipe_index().search(
+            cuisine=cuisine, difficulty=difficulty, max_time=max_recipe_time, exclude=exclude_ingredients
+        )
+        if not candidates:
+            return {"error": "No recipes match the filters"}
         
-        # Create weekly menu
-        weekly_menu = {}
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        # Cached per-person averages, rescored incrementally when ingredient scores change
+        score_cache = self.get_score_cache()
+        version = self.score_store.version
+        average_scores = score_cache.averages(person)
         
-        recipe_index = 0
-        for day in days:
-            daily_menu = {}
-            
-            # Assign meals for the day
-            for meal_type in ['Breakfast', 'Lunch', 'Dinner']:
-                # Find a suitable recipe for this meal type
-                suitable_recipes = [
-                    rs for rs in recipe_scores 
-                    if meal_type in rs['recipe'].get('meal_type', [])
-                ]
-                
-                if suitable_recipes:
-                    # Pick the best scoring suitable recipe
-                    chosen_recipe = suitable_recipes[0]
-                    daily_menu[meal_type] = {
-                        'recipe': chosen_recipe['recipe'],
-                        'inflammation_score': chosen_recipe['score_data']['average_inflammation_score'],
-                        'prep_time': chosen_recipe['recipe']['prep_time_minutes'],
-                        'total_time': chosen_recipe['recipe']['total_time_minutes'],
-                        'servings': chosen_recipe['recipe']['servings']
-                    }
-                    # Remove this recipe from available options to avoid repetition
-                    recipe_scores = [rs for rs in recipe_scores if rs['recipe']['id'] != chosen_recipe['recipe']['id']]
-                else:
-                    # If no suitable recipe found, pick any available recipe
-                    if recipe_scores:
-                        chosen_recipe = recipe_scores[recipe_index % len(recipe_scores)]
-                        daily_menu[meal_type] = {
-                            'recipe': chosen_recipe['recipe'],
-                            'inflammation_score': chosen_recipe['score_data']['average_inflammation_score'],
-                            'prep_time': chosen_recipe['recipe']['prep_time_minutes'],
-                            'total_time': chosen_recipe['recipe']['total_time_minutes'],
-                            'servings': chosen_recipe['recipe']['servings']
-                        }
-                        recipe_index += 1
-            
-            weekly_menu[day] = daily_menu
+        planner = WeeklyMenuPlanner(
+            self.recipes, average_scores,
+            minimize_inflammation=minimize_inflammation,
+            no_repeat_days=no_repeat_days,
+            max_daily_time=max_daily_time,
+            max_cuisine_per_day=max_cuisine_per_day,
+            candidates=candidates
+        )
+        weekly_menu = planner.plan(DAYS)
         
         # Calculate weekly statistics
         total_inflammation = sum(
@@ -237,45 +363,50 @@ class InflammationRecipeCalculator:
         )
         avg_daily_inflammation = total_inflammation / 7
         
+        if menu_id is not None:
+            meals = [meal for day_menu in weekly_menu.values() for meal in day_menu.values()]
+            self.menus.track(TrackedMenu(
+                menu_id, person,
+                [score_cache.recipe_index[meal['recipe']['id']] for meal in meals],
+                [meal['inflammation_score'] for meal in meals],
+                minimize_inflammation,
+                {
+                    'minimize_inflammation': minimize_inflammation,
+                    'no_repeat_days': no_repeat_days,
+                    'max_daily_time': max_daily_time,
+                    'max_cuisine_per_day': max_cuisine_per_day,
+                    'exclude_ingredients': list(exclude_ingredients),
+                    'cuisine': cuisine,
+                    'difficulty': difficulty,
+                    'max_recipe_time': max_recipe_time
+                },
+                version
+            ))
+        
         return {
             'person': person,
             'optimization_goal': 'minimize_inflammation' if minimize_inflammation else 'maximize_inflammation',
             'weekly_menu': weekly_menu,
+            'unfilled_slots': planner.unfilled,
             'statistics': {
                 'total_weekly_inflammation_score': round(total_inflammation, 3),
                 'average_daily_inflammation_score': round(avg_daily_inflammation, 3),
-                'total_meals': len(days) * 3
+                'total_meals': sum(len(day_menu) for day_menu in weekly_menu.values())
             }
         }
     
     def generate_shopping_list(self, weekly_menu: Dict) -> Dict:
         """Generate a shopping list from the weekly menu"""
-        shopping_list = {}
-        
-        for day, meals in weekly_menu['weekly_menu'].items():
-            for meal_type, meal_data in meals.items():
-                recipe = meal_data['recipe']
-                for ingredient in recipe['ingredients']:
-                    ingredient_name = ingredient['name']
-                    quantity = ingredient['quantity']
-                    unit = ingredient['unit']
-                    
-                    if ingredient_name in shopping_list:
-                        # Add to existing quantity (simplified - assumes same unit)
-                        shopping_list[ingredient_name]['total_quantity'] += quantity
-                    else:
-                        shopping_list[ingredient_name] = {
-                            'unit': unit,
-                            'total_quantity': quantity,
-                            'used_in_meals': []
-                        }
-                    
-                    shopping_list[ingredient_name]['used_in_meals'].append(f"{day} {meal_type}: {recipe['title']}")
-        
-        return {
-            'shopping_list': shopping_list,
-            'total_unique_ingredients': len(shopping_list)
-        }
+        return self.generate_combined_shopping_list([weekly_menu])
+    
+    def generate_combined_shopping_list(self, weekly_menus: Iterable[Dict]) -> Dict:
+        """
+        Generate one shopping list for a stream of weekly menus (a household or a batch).
+        Units are normalized and synonyms merged, see ShoppingListAggregator.
+        """
+        recipes_by_id = {recipe['id']: recipe for recipe in self.recipes}
+        aggregator = ShoppingListAggregator(recipes_by_id)
+        return aggregator.add_menus(weekly_menus).result()
 
 def main():
     """Main function to demonstrate the inflammation calculator"""
@@ -285,18 +416,19 @@ def main():
     
     # Calculate scores for all recipes for all people
     print("Calculating inflammation scores for all recipes...")
+    batch_scores = calc.batch_score_recipes()
     for recipe in calc.recipes:
         print(f"\nRecipe: {recipe['title']}")
-        scores = calc.get_recipe_scores_for_all_people(recipe)
         
-        for person, score_data in scores.items():
+        for person in calc.people:
+            score_data = batch_scores.summary(recipe['id'], person)
             print(f"  {person.capitalize()}: {score_data['average_inflammation_score']:.3f} "
                   f"({score_data['match_percentage']:.1f}% ingredients matched)")
     
     # Create weekly menus for each person
     print("\n=== WEEKLY MENU GENERATION ===\n")
     
-    for person in ['general', 'sam', 'andrea']:
+    for person in calc.people:
         print(f"\nCreating weekly menu for {person.capitalize()}...")
         weekly_menu = calc.create_weekly_menu(person, minimize_inflammation=True)
         
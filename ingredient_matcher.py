@@ -0,0 +1,146 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+# Common recipe names that don't appear (even as substrings) in the inflammation database
+INGREDIENT_MAPPINGS = {
+    'ground beef': 'beef',
+    'chicken breast': 'chicken',
+    'all-purpose flour': 'flour',
+    'canned tomatoes': 'tomatoes',
+    'fresh basil': 'basil',
+    'romaine lettuce': 'lettuce',
+    'hamburger buns': 'bread',
+    'egg noodles': 'pasta',
+    'heavy cream': 'cream',
+    'vegetable oil': 'oil'
+}
+
+# Longest substring length kept in the n-gram index
+GRAM_SIZE = 3
+
+
+def singular(word: str) -> str:
+    """'tomatoes' -> 'tomato', 'berries' -> 'berry'; good enough for ingredient names"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+class IngredientMatcher:
+    """
+    Prebuilt index for matching recipe ingredient names against the inflammation database.
+
+    Resolves exactly like the original linear scan: a direct match first, then the first
+    database name (in load order) that contains or is contained in the recipe name, then
+    the fixed INGREDIENT_MAPPINGS. Resolved names are memoized.
+    """
+
+    def __init__(self, db_ingredients: Iterable[str], mappings: Optional[Dict[str, str]] = None):
+        self.names: List[str] = list(db_ingredients)
+        self.mappings = INGREDIENT_MAPPINGS if mappings is None else mappings
+        self.position = {}
+        for pos, name in enumerate(self.names):
+            self.position.setdefault(name, pos)
+
+        self.trie: Optional[Dict[str, dict]] = None
+        self.grams = None
+        self._memo: Dict[str, Optional[str]] = {}
+
+    def build_index(self):
+        """Build the substring indexes (done lazily on the first non-direct lookup)"""
+        # Character trie over names; the '' key of a node holds the position of the name ending there
+        trie: Dict[str, dict] = {}
+        for pos, name in enumerate(self.names):
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node.setdefault('', pos)
+
+        # Every substring of length 1..GRAM_SIZE -> ascending list of name positions
+        grams = defaultdict(list)
+        for pos, name in enumerate(self.names):
+            for gram in self._substrings(name, GRAM_SIZE):
+                grams[gram].append(pos)
+
+        self.trie = trie
+        self.grams = grams
+
+    @staticmethod
+    def _substrings(text: str, max_length: int) -> set:
+        return {
+            text[start:start + length]
+            for length in range(1, max_length + 1)
+            for start in range(len(text) - length + 1)
+        }
+
+    def match(self, recipe_ingredient: str) -> Optional[str]:
+        """Return the database ingredient matching recipe_ingredient, or None"""
+        key = recipe_ingredient.lower().strip()
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        result = self._resolve(key)
+        self._memo[key] = result
+        return result
+
+    def _resolve(self, key: str) -> Optional[str]:
+        # Direct match
+        if key in self.position:
+            return key
+
+        if self.trie is None:
+            self.build_index()
+        best = min(self._first_contained_in(key), self._first_containing(key))
+        if best < len(self.names):
+            return self.names[best]
+
+        # Fall back to the common ingredient mappings
+        mapped = self.mappings.get(key)
+        if mapped is not None and mapped in self.position:
+            return mapped
+        return None
+
+    def _first_contained_in(self, key: str) -> int:
+        """Lowest position of a database name that is a substring of key"""
+        best = self.trie.get('', len(self.names))
+        for start in range(len(key)):
+            node = self.trie
+            for char in key[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                pos = node.get('')
+                if pos is not None and pos < best:
+                    best = pos
+        return best
+
+    def _first_containing(self, key: str) -> int:
+        """Lowest position of a database name that contains key"""
+        if not key:
+            return 0
+        if len(key) <= GRAM_SIZE:
+            # Short keys are indexed directly, so the posting list is exact
+            postings = self.grams.get(key)
+            return postings[0] if postings else len(self.names)
+
+        # Verify candidates from the rarest n-gram of the key, in load order
+        candidates = None
+        for start in range(len(key) - GRAM_SIZE + 1):
+            postings = self.grams.get(key[start:start + GRAM_SIZE])
+            if not postings:
+                return len(self.names)
+            if candidates is None or len(postings) < len(candidates):
+                candidates = postings
+        for pos in candidates:
+            if key in self.names[pos]:
+                return pos
+        return len(self.names)
+
+    def clear_cache(self):
+        """Forget memoized matches"""
+        self._memo.clear()
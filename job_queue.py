@@ -0,0 +1,145 @@
+"""
+In-process background jobs for slow upload work (caption, analysis).
+
+Jobs run on a local thread pool; no broker. Each job records how long it waited in the
+queue and how long each named stage took, and finished jobs are kept (bounded) so clients
+can poll for the result.
+"""
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from llm_fanout import CallTimings
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class Job:
+    def __init__(self, kind: str, owner: Optional[str] = None, timings: Optional[CallTimings] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner = owner
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.finished = threading.Event()
+        self._timings = timings
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time one step of the job"""
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = round(seconds, 4)
+            if self._timings is not None:
+                self._timings.record(f"{self.kind}.{name}", seconds, outcome)
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'stages': dict(self.stages),
+            'result': self.result,
+            'error': self.error
+        }
+
+
+class JobQueue:
+    """Thread-pool job runner with pollable, bounded job history"""
+
+    def __init__(self, max_workers: int = 4, max_jobs: int = 1000):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.timings = CallTimings()
+        self._jobs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+
+    def submit(self, kind: str, fn: Callable[[Job], Any], owner: Optional[str] = None) -> Job:
+        """Queue fn(job); its return value becomes job.result"""
+        job = Job(kind, owner, self.timings)
+        with self._lock:
+            self._jobs[job.id] = job
+            self.counts[QUEUED] += 1
+            self._prune()
+        self.executor.submit(contextvars.copy_context().run, self._run, job, fn)
+        return job
+
+    def _prune(self):
+        # Drop the oldest finished jobs once the history is full
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished.is_set()][:excess]:
+            del self._jobs[job_id]
+
+    def _set_status(self, job: Job, status: str):
+        with self._lock:
+            self.counts[job.status] -= 1
+            self.counts[status] += 1
+            job.status = status
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        job.started_at = time.time()
+        job.stages['queue_wait'] = round(job.started_at - job.created_at, 4)
+        self.timings.record(f"{job.kind}.queue_wait", job.started_at - job.created_at)
+        self._set_status(job, RUNNING)
+        try:
+            job.result = fn(job)
+        except Exception as e:
+            job.error = str(e)
+            status = FAILED
+        else:
+            status = DONE
+        job.finished_at = time.time()
+        self.timings.record(f"{job.kind}.total", job.finished_at - job.created_at,
+                            'ok' if status == DONE else 'error')
+        self._set_status(job, status)
+        job.finished.set()
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def wait(self, job: Job, timeout: float) -> Job:
+        """Block up to timeout seconds for the job to finish (long polling)"""
+        job.finished.wait(timeout)
+        return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+            kept = len(self._jobs)
+        return {
+            'queue_depth': counts[QUEUED],
+            'running': counts[RUNNING],
+            'done': counts[DONE],
+            'failed': counts[FAILED],
+            'jobs_kept': kept,
+            'workers': self.max_workers,
+            'stages': self.timings.stats()
+        }
@@ -0,0 +1,112 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class CallTimings:
+    """Recent latencies and outcome counts per named call"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, seconds: float, outcome: str = 'ok'):
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            counts = self._counts.setdefault(name, {'ok': 0, 'error': 0, 'timeout': 0})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            result = {}
+            for name, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                result[name] = dict(
+                    self._counts[name],
+                    p50_ms=round(ordered[len(ordered) // 2] * 1000, 1),
+                    p95_ms=round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                    max_ms=round(ordered[-1] * 1000, 1)
+                )
+            return result
+
+
+class _Claim:
+    """Lets exactly one of the worker and the waiting caller record a call's outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._claimed = False
+
+    def claim(self) -> bool:
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            return True
+
+
+class LLMFanout:
+    """
+    Shared thread pool for independent upstream (LLM) calls.
+
+    gather() runs several calls at once; each has its own timeout and fallback, so one slow
+    or failing call never blocks the others. Latencies are recorded per call name, once per
+    call: a timed-out call is counted as a timeout and not again when it finishes late.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self.timings = CallTimings()
+
+    def _timed(self, name: str, fn: Callable, args, kwargs, claim: Optional[_Claim] = None):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            if claim is None or claim.claim():
+                self.timings.record(name, time.perf_counter() - start, 'error')
+            raise
+        if claim is None or claim.claim():
+            self.timings.record(name, time.perf_counter() - start)
+        return result
+
+    def _submit(self, name: str, fn: Callable, args, kwargs, claim: Optional[_Claim] = None):
+        # Run in a copy of the caller's context so request-scoped values (request ID) follow
+        context = contextvars.copy_context()
+        return self.executor.submit(context.run, self._timed, name, fn, args, kwargs, claim)
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs):
+        return self._submit(name, fn, args, kwargs)
+
+    def call(self, name: str, fn: Callable, timeout: Optional[float] = None, fallback: Any = None,
+             *args, **kwargs):
+        """Run one call on the shared pool, returning fallback on timeout or error"""
+        return self.gather({name: (lambda: fn(*args, **kwargs), timeout, fallback)})[name]
+
+    def gather(self, calls: Dict[str, Tuple[Callable[[], Any], Optional[float], Any]]) -> Dict[str, Any]:
+        """
+        Run {name: (fn, timeout_seconds, fallback)} concurrently and return {name: result}.
+        Timeouts count from submission; a late call keeps running but its result is dropped.
+        """
+        start = time.monotonic()
+        futures = {}
+        for name, (fn, timeout, fallback) in calls.items():
+            claim = _Claim()
+            futures[name] = (self._submit(name, fn, (), {}, claim), claim, timeout, fallback)
+        results = {}
+        for name, (future, claim, timeout, fallback) in futures.items():
+            remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeout:
+                if claim.claim():
+                    self.timings.record(name, time.monotonic() - start, 'timeout')
+                results[name] = fallback
+            except Exception:
+                results[name] = fallback
+        return results
@@ -0,0 +1,239 @@
+"""
+Parsing and validation of structured LLM replies.
+
+Replies are requested in JSON mode, but models still wrap output in prose or code fences,
+assign it to a variable, leave trailing commas or comments, use Python literals, or get cut
+off. We repair those locally (never exec, never another paid call), validate against a
+small schema, and count outcomes per schema so the failure rate is visible.
+"""
+import ast
+import json
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+JSON_MODE = {"type": "json_object"}
+
+
+class ParseError(ValueError):
+    pass
+
+
+# ——— Schemas ———
+# field: (expected type, required); float fields accept ints and numeric strings
+STORE_SCHEMA = {
+    'name': (str, True),
+    'address': (str, True),
+    'price': (str, False),
+    'healthiness_score': (float, False)
+}
+
+INGREDIENT_SCHEMA = {
+    'name': (str, True),
+    'quantity_grams': (float, False)
+}
+
+FOOD_ANALYSIS_SCHEMA = {
+    'detected_food': (str, True),
+    'ingredients': ([INGREDIENT_SCHEMA], True),
+    'total_calories': (float, False),
+    'inflammation_level': (str, False),
+    'health_score': (float, False)
+}
+
+
+def _number(value):
+    if isinstance(value, bool):
+        raise ParseError(f"expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = re.search(r'-?\d+(?:\.\d+)?', value)
+        if match:
+            number = float(match.group())
+            return int(number) if number.is_integer() else number
+    raise ParseError(f"expected a number, got {value!r}")
+
+
+def validate(obj: Any, schema: Dict) -> Dict:
+    """Check obj against schema, coercing numbers; unknown keys are kept as-is"""
+    if not isinstance(obj, dict):
+        raise ParseError(f"expected an object, got {type(obj).__name__}")
+    result = dict(obj)
+    for field, (expected, required) in schema.items():
+        if obj.get(field) is None:
+            if required:
+                raise ParseError(f"missing field {field!r}")
+            continue
+        value = obj[field]
+        if expected is float:
+            result[field] = _number(value)
+        elif isinstance(expected, list):
+            if not isinstance(value, list):
+                raise ParseError(f"field {field!r} should be a list")
+            result[field] = [validate(item, expected[0]) for item in value]
+        elif expected is str:
+            if isinstance(value, (dict, list)):
+                raise ParseError(f"field {field!r} should be a string")
+            result[field] = str(value)
+    return result
+
+
+# ——— Repair ———
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+def _strip_comments(text: str) -> str:
+    """Drop # and // comments that sit outside string literals"""
+    out = []
+    quote = None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            out.append(ch)
+            if ch == '\\' and i + 1 < len(text):
+                out.append(text[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+            out.append(ch)
+        elif ch == '#' or text.startswith('//', i):
+            while i < len(text) and text[i] != '\n':
+                i += 1
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return ''.join(out)
+
+
+def _from_first_bracket(text: str) -> str:
+    # Skip any prose before the payload; its apostrophes would read as open quotes
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if not starts:
+        raise ParseError("no JSON object or array in reply")
+    return text[min(starts):]
+
+
+def _outermost(text: str) -> str:
+    """The leading balanced {...} or [...] block; a truncated one is cut back to its last
+    complete element and closed"""
+    stack = []
+    quote = None
+    safe = None  # (end, open brackets) after the last complete element
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if stack and stack[-1] == ch:
+                stack.pop()
+            if not stack:
+                return text[:i + 1]
+            safe = (i + 1, list(stack))
+        elif ch == ',':
+            safe = (i, list(stack))
+        i += 1
+    if safe is None:
+        raise ParseError("truncated reply")
+    end, open_brackets = safe
+    return text[:end] + ''.join(reversed(open_brackets))
+
+
+def repair(text: str) -> str:
+    text = _from_first_bracket(text)
+    text = _strip_comments(text)
+    text = _outermost(text)
+    return _TRAILING_COMMA.sub(r'\1', text)
+
+
+def loads(text: str) -> Tuple[Any, bool]:
+    """Parse a reply as JSON, repairing it if needed; returns (value, repaired)"""
+    try:
+        return json.loads(text), False
+    except (json.JSONDecodeError, TypeError):
+        pass
+    if not isinstance(text, str):
+        raise ParseError("reply is not text")
+    repaired = repair(text)
+    try:
+        return json.loads(repaired), True
+    except json.JSONDecodeError:
+        pass
+    try:
+        # Python-style literals (single quotes, True/None); literal_eval never runs code
+        return ast.literal_eval(repaired), True
+    except (ValueError, SyntaxError, MemoryError, RecursionError) as e:
+        raise ParseError(f"unparseable reply: {e}") from None
+
+
+class ParseStats:
+    """Outcome counts per schema: parsed cleanly, parsed after repair, or failed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'ok': 0, 'repaired': 0, 'failed': 0})
+            counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            result = {}
+            for name, counts in self._counts.items():
+                total = sum(counts.values())
+                result[name] = dict(counts, total=total,
+                                    failure_rate=round(counts['failed'] / total, 4) if total else 0.0)
+            return result
+
+
+parse_stats = ParseStats()
+
+
+def _parse(name: str, text: str, validator):
+    try:
+        value, repaired = loads(text)
+        result = validator(value)
+    except ParseError:
+        parse_stats.record(name, 'failed')
+        raise
+    parse_stats.record(name, 'repaired' if repaired else 'ok')
+    return result
+
+
+def _stores(value) -> List[Dict]:
+    if isinstance(value, dict):
+        value = value.get('stores')
+    if not isinstance(value, list):
+        raise ParseError("expected a list of stores")
+    stores = []
+    for item in value:
+        try:
+            stores.append(validate(item, STORE_SCHEMA))
+        except ParseError:
+            continue
+    if value and not stores:
+        raise ParseError("no valid stores in reply")
+    return stores
+
+
+def parse_stores(text: str) -> List[Dict]:
+    """Stores from a {"stores": [...]} (or bare list) reply; malformed items are dropped"""
+    return _parse('stores', text, _stores)
+
+
+def parse_food_analysis(text: str) -> Dict:
+    return _parse('food_analysis', text, lambda value: validate(value, FOOD_ANALYSIS_SCHEMA))
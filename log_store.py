@@ -0,0 +1,121 @@
+"""
+SQLite storage for user profiles and food/pain log entries.
+
+The database runs in WAL mode so gunicorn workers can read while another writes; entry IDs
+come from AUTOINCREMENT, so concurrent POSTs never share an ID. Each thread gets its own
+connection.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_FIELDS = ['age', 'sex', 'diet', 'conditions', 'allergies', 'medications']
+ENTRY_FIELDS = ['food', 'pain', 'symptoms', 'mood', 'energy', 'supplements', 'voice', 'image', 'caption']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    {', '.join(f'{field} TEXT' for field in PROFILE_FIELDS)},
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    {', '.join(f'{field} TEXT' for field in ENTRY_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS entries_user_created ON entries (user_id, created_at);
+"""
+
+
+class LogStore:
+    """Per-user profiles and log entries"""
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    # ——— Profiles ———
+    def get_profile(self, user_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save_profile(self, user_id: str, profile: Dict) -> Dict:
+        values = [profile.get(field) for field in PROFILE_FIELDS]
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO profiles (user_id, {', '.join(PROFILE_FIELDS)}, updated_at) "
+                f"VALUES (?, {', '.join('?' for _ in PROFILE_FIELDS)}, ?)",
+                [user_id] + values + [time.time()]
+            )
+        return dict(zip(PROFILE_FIELDS, values))
+
+    # ——— Entries ———
+    def add_entry(self, user_id: str, entry: Dict) -> Dict:
+        """Insert an entry and return it with its database ID"""
+        values = [entry.get(field) for field in ENTRY_FIELDS]
+        created_at = time.time()
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                f"INSERT INTO entries (user_id, created_at, {', '.join(ENTRY_FIELDS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in ENTRY_FIELDS)})",
+                [user_id, created_at] + values
+            )
+        return dict(zip(ENTRY_FIELDS, values), id=cursor.lastrowid, created_at=created_at)
+
+    def update_entry(self, user_id: str, entry_id: int, **fields) -> None:
+        fields = {field: value for field, value in fields.items() if field in ENTRY_FIELDS}
+        if not fields:
+            return
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f"UPDATE entries SET {', '.join(f'{field} = ?' for field in fields)} "
+                f"WHERE id = ? AND user_id = ?",
+                list(fields.values()) + [entry_id, user_id]
+            )
+
+    def get_entry(self, user_id: str, entry_id: int) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT * FROM entries WHERE id = ? AND user_id = ?", (entry_id, user_id)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def latest_entry(self, user_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT * FROM entries WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 1", (user_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def list_entries(self, user_id: str, page: int = 1, per_page: int = 20) -> Tuple[List[Dict], bool]:
+        """Newest-first page of entries and whether an older page exists"""
+        page = max(1, page)
+        rows = self._connection().execute(
+            "SELECT * FROM entries WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (user_id, per_page + 1, (page - 1) * per_page)
+        ).fetchall()
+        return [dict(row) for row in rows[:per_page]], len(rows) > per_page
@@ -0,0 +1,148 @@
+import heapq
+from typing import Dict, List, Optional, Sequence
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MEAL_TYPES = ['Breakfast', 'Lunch', 'Dinner']
+
+# Heap used when no recipe of the requested meal type is left
+ANY_MEAL = None
+
+
+class WeeklyMenuPlanner:
+    """
+    Plan a weekly menu from per-meal-type heaps of recipes ordered by inflammation score.
+
+    Each slot pops the best recipe from its meal type's heap (O(log n)), skipping recipes
+    that break a constraint:
+      - no_repeat_days: a recipe can't be served again within this many days (7 = once a week)
+      - max_daily_time: cap on the summed total_time_minutes of a day's meals
+      - max_cuisine_per_day: cap on meals of the same cuisine in one day
+    Used recipes are invalidated lazily with a per-recipe version counter and come back
+    once their repeat window has passed. When the pool runs dry only the repeat window is
+    relaxed; a slot that no recipe can fill without breaking max_daily_time or
+    max_cuisine_per_day is left empty and listed in `unfilled` after plan().
+    """
+
+    def __init__(self, recipes: List[Dict], scores: Sequence[float], minimize_inflammation: bool = True,
+                 no_repeat_days: int = 7, max_daily_time: Optional[int] = None,
+                 max_cuisine_per_day: Optional[int] = None, candidates: Optional[Sequence[int]] = None):
+        self.recipes = recipes
+        self.scores = scores
+        self.minimize_inflammation = minimize_inflammation
+        self.no_repeat_days = max(1, no_repeat_days)
+        self.max_daily_time = max_daily_time
+        self.max_cuisine_per_day = max_cuisine_per_day
+        self.candidates = range(len(recipes)) if candidates is None else candidates
+        self.unfilled: List[Dict[str, str]] = []
+
+    def _key(self, index: int):
+        score = self.scores[index]
+        # Ties keep recipe order, like the original stable sort
+        return (score if self.minimize_inflammation else -score, index)
+
+    def _build_heaps(self) -> Dict[Optional[str], list]:
+        heaps = {meal_type: [] for meal_type in MEAL_TYPES}
+        heaps[ANY_MEAL] = []
+        for index in self.candidates:
+            entry = self._key(index) + (0,)
+            heaps[ANY_MEAL].append(entry)
+            for meal_type in self.recipes[index].get('meal_type', []):
+                if meal_type in heaps:
+                    heaps[meal_type].append(entry)
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        return heaps
+
+    def _fits(self, index: int, day_time: int, day_cuisines: Dict[str, int]) -> bool:
+        recipe = self.recipes[index]
+        if self.max_daily_time is not None and day_time + recipe.get('total_time_minutes', 0) > self.max_daily_time:
+            return False
+        if self.max_cuisine_per_day is not None and day_cuisines.get(recipe.get('cuisine'), 0) >= self.max_cuisine_per_day:
+            return False
+        return True
+
+    def _pop_best(self, heap: list, versions: List[int], day_time: int, day_cuisines: Dict[str, int]) -> Optional[int]:
+        """Pop the best valid recipe that fits today's constraints; skipped recipes are pushed back"""
+        skipped = []
+        chosen = None
+        while heap:
+            entry = heapq.heappop(heap)
+            index, version = entry[1], entry[2]
+            if version != versions[index]:
+                continue  # Stale: used since this entry was pushed
+            if self._fits(index, day_time, day_cuisines):
+                chosen = index
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return chosen
+
+    def _relaxed_pick(self, meal_type: str, last_used: Dict[int, int],
+                      used_today: set, day_time: int, day_cuisines: Dict[str, int]) -> Optional[int]:
+        """
+        Last resort when no heap has a recipe that fits: serve the least recently used recipe
+        that still fits today's constraints again, never twice in the same day. Only the
+        repeat window is relaxed. O(n), only hit on small pools or tight constraints.
+        """
+        pool = [i for i in self.candidates if meal_type in self.recipes[i].get('meal_type', [])]
+        pool = [i for i in (pool or self.candidates)
+                if i not in used_today and self._fits(i, day_time, day_cuisines)]
+        if not pool:
+            return None
+        return min(pool, key=lambda i: (last_used.get(i, -1), self._key(i)))
+
+    def plan(self, days: Sequence[str] = DAYS, meal_types: Sequence[str] = MEAL_TYPES) -> Dict:
+        """Return {day: {meal_type: meal}} in the format create_weekly_menu has always used"""
+        heaps = self._build_heaps()
+        versions = [0] * len(self.recipes)
+        returning: Dict[int, List[int]] = {}
+        last_used: Dict[int, int] = {}
+        weekly_menu = {}
+        self.unfilled = []
+
+        for day_index, day in enumerate(days):
+            # Recipes whose repeat window ended go back into their heaps
+            for index in returning.pop(day_index, []):
+                if last_used[index] + self.no_repeat_days > day_index:
+                    continue  # Served again since, a later return is already scheduled
+                entry = self._key(index) + (versions[index],)
+                heapq.heappush(heaps[ANY_MEAL], entry)
+                for meal_type in self.recipes[index].get('meal_type', []):
+                    if meal_type in heaps:
+                        heapq.heappush(heaps[meal_type], entry)
+
+            daily_menu = {}
+            day_time = 0
+            day_cuisines: Dict[str, int] = {}
+            used_today = set()
+            for meal_type in meal_types:
+                index = self._pop_best(heaps.get(meal_type, []), versions, day_time, day_cuisines)
+                if index is None:
+                    index = self._pop_best(heaps[ANY_MEAL], versions, day_time, day_cuisines)
+                if index is None:
+                    index = self._relaxed_pick(meal_type, last_used, used_today, day_time, day_cuisines)
+                if index is None:
+                    self.unfilled.append({'day': day, 'meal_type': meal_type})
+                    continue
+
+                recipe = self.recipes[index]
+                daily_menu[meal_type] = {
+                    'recipe': recipe,
+                    'inflammation_score': self.scores[index],
+                    'prep_time': recipe['prep_time_minutes'],
+                    'total_time': recipe['total_time_minutes'],
+                    'servings': recipe['servings']
+                }
+                day_time += recipe.get('total_time_minutes', 0)
+                cuisine = recipe.get('cuisine')
+                day_cuisines[cuisine] = day_cuisines.get(cuisine, 0) + 1
+                used_today.add(index)
+                last_used[index] = day_index
+
+                # Invalidate every heap entry for this recipe until its repeat window ends
+                versions[index] += 1
+                returning.setdefault(day_index + self.no_repeat_days, []).append(index)
+
+            weekly_menu[day] = daily_menu
+        return weekly_menu
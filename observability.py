@@ -0,0 +1,190 @@
+"""
+Structured logging, request IDs and Prometheus-format stage histograms.
+
+Log records are JSON lines tagged with the current request ID and written by a background
+listener thread, so a request never blocks on stdout. stage_timer() times one step of a
+request (upload save, BLIP generate, OpenAI call, ...) into a histogram that /metrics
+renders in the Prometheus text format. Metrics are per process; with several gunicorn
+workers, scrape each one or aggregate downstream.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar('request_id', default=None)
+
+# Seconds; covers sub-ms cache hits through multi-second LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+log = logging.getLogger('guttrack')
+
+
+# ——— Logging ———
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None)
+        }
+        payload.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Filters run in the calling thread, before the record is queued for the listener
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = 'INFO', stream=None) -> logging.Logger:
+    """JSON logs at `level`, handed to a listener thread through a queue"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JSONFormatter())
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+
+    log.handlers[:] = [queue_handler]
+    log.setLevel(getattr(logging, level.upper(), logging.INFO))
+    log.propagate = False
+    return log
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Use the caller's X-Request-ID when it looks sane, otherwise make one"""
+    if incoming and len(incoming) <= 64 and incoming.replace('-', '').isalnum():
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+# ——— Metrics ———
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple((name, labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {values[-2]!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {values[-1]}")
+        return '\n'.join(lines)
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> str:
+        return f"# HELP {self.name} {self.help}\n# TYPE {self.name} gauge\n{self.name} {_format_value(self.read())}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        metric = Gauge(name, help_text, read)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram(
+    'guttrack_stage_seconds', 'Time spent in one stage of a request', labelnames=('stage', 'outcome')
+)
+request_seconds = registry.histogram(
+    'guttrack_http_request_seconds', 'HTTP request latency', labelnames=('endpoint', 'method', 'status')
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block into guttrack_stage_seconds{stage=...} and log it at DEBUG"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        stage_seconds.observe(seconds, stage=stage, outcome=outcome)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("stage %s %s", stage, outcome,
+                      extra={'fields': {'stage': stage, 'outcome': outcome, 'ms': round(seconds * 1000, 2)}})
@@ -0,0 +1,216 @@
+"""
+Recipe query engine: inverted indexes with bitset masks.
+
+Every filterable attribute value maps to a bitset of recipe rows (a Python int, bit i set
+when recipe i matches), so a combined filter is a handful of integer ANDs:
+
+    meal_type, cuisine, difficulty, category   value -> bitset (OR within one attribute)
+    total_time_minutes                          cumulative "time <= t" bitset per distinct time
+    ingredients                                 recipe ingredient name -> recipe rows (postings)
+
+Ingredient exclusion (allergies) matches whole words, plural-insensitive: "egg" excludes
+"eggs" and "egg noodles" but not "eggplant". Allergen groups ("dairy", "gluten", "tree
+nuts", ...) expand to the ingredients they cover through ALLERGENS, erring on the side of
+excluding. Terms that match no ingredient are reported by unmatched_terms() rather than
+silently ignored. Term masks are cached, so repeated profiles cost only ANDs.
+"""
+import re
+import threading
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ingredient_matcher import singular
+
+ATTRIBUTES = ('meal_type', 'cuisine', 'difficulty', 'category')
+MAX_CACHED_TERMS = 4096
+
+# Common allergen groups -> ingredient words they cover
+ALLERGENS = {
+    'dairy': ('milk', 'cheese', 'butter', 'buttermilk', 'cream', 'yogurt', 'yoghurt', 'ghee', 'whey', 'casein',
+              'curd', 'kefir', 'custard', 'cheddar', 'mozzarella', 'parmesan', 'feta', 'ricotta', 'mascarpone',
+              'brie', 'paneer'),
+    'gluten': ('wheat', 'flour', 'bread', 'breadcrumb', 'bun', 'bagel', 'biscuit', 'cracker', 'croissant',
+               'dough', 'pastry', 'cake', 'cookie', 'pasta', 'spaghetti', 'macaroni', 'lasagna', 'noodle',
+               'couscous', 'semolina', 'bulgur', 'barley', 'rye', 'malt', 'beer', 'seitan', 'tortilla',
+               'soy sauce', 'worcestershire sauce'),
+    'tree nuts': ('nut', 'almond', 'walnut', 'pecan', 'cashew', 'pistachio', 'hazelnut', 'macadamia',
+                  'brazil nut', 'pine nut', 'chestnut', 'praline', 'marzipan'),
+    'peanuts': ('peanut', 'groundnut'),
+    'shellfish': ('shellfish', 'shrimp', 'prawn', 'crab', 'lobster', 'crawfish', 'crayfish', 'clam', 'mussel',
+                  'oyster', 'scallop', 'squid', 'calamari', 'octopus'),
+    'fish': ('fish', 'salmon', 'tuna', 'cod', 'anchovy', 'sardine', 'tilapia', 'trout', 'halibut', 'mackerel',
+             'haddock', 'herring', 'snapper', 'bass', 'catfish', 'swordfish', 'worcestershire sauce'),
+    'eggs': ('egg', 'mayonnaise', 'mayo', 'meringue', 'aioli'),
+    'soy': ('soy', 'soya', 'soybean', 'tofu', 'edamame', 'miso', 'tempeh'),
+    'sesame': ('sesame', 'tahini')
+}
+ALLERGEN_ALIASES = {
+    'lactose': 'dairy', 'milk product': 'dairy', 'nut': 'tree nuts', 'seafood': 'shellfish',
+    'wheat': 'gluten', 'gluten free': 'gluten', 'soya': 'soy'
+}
+
+Values = Union[str, Iterable[str], None]
+Words = Tuple[str, ...]
+
+
+def words(text: str) -> Words:
+    """'Canned Tomatoes' -> ('canned', 'tomato')"""
+    return tuple(singular(word) for word in re.findall(r"[a-z]+", text.lower()))
+
+
+def contains_words(name: Words, term: Words) -> bool:
+    size = len(term)
+    return any(name[start:start + size] == term for start in range(len(name) - size + 1))
+
+
+def allergen_words(term: str) -> Optional[List[Words]]:
+    """Ingredient words covered by an allergen group (or alias), None for a plain term"""
+    key = ' '.join(words(term))
+    key = ' '.join(words(ALLERGEN_ALIASES.get(key, key)))
+    for group, ingredients in ALLERGENS.items():
+        if ' '.join(words(group)) == key:
+            return [words(ingredient) for ingredient in ingredients]
+    return None
+
+
+def parse_terms(text: Optional[str]) -> List[str]:
+    """'Peanuts, shellfish and dairy' -> ['peanuts', 'shellfish', 'dairy']"""
+    if not text:
+        return []
+    terms = re.split(r'[,;/\n]|\band\b', text.lower())
+    return [term.strip() for term in terms if term.strip() and term.strip() not in ('none', 'n/a', 'no')]
+
+
+class RecipeIndex:
+    """Bitset indexes over a recipe list; query() returns recipe rows in recipe order"""
+
+    def __init__(self, recipes: List[Dict]):
+        self.recipes = recipes
+        self.size = len(recipes)
+        self.all = (1 << self.size) - 1
+
+        rows_by_value: Dict[str, Dict[str, List[int]]] = {attribute: {} for attribute in ATTRIBUTES}
+        self.name_rows: Dict[str, List[int]] = {}  # recipe ingredient name -> recipe rows
+        for row, recipe in enumerate(recipes):
+            for attribute in ATTRIBUTES:
+                values = recipe.get(attribute)
+                for value in (values if isinstance(values, list) else [values]):
+                    if value:
+                        rows_by_value[attribute].setdefault(value.lower(), []).append(row)
+            for ingredient in recipe['ingredients']:
+                name = ingredient['name'].lower().strip()
+                self.name_rows.setdefault(name, []).append(row)
+        self.name_words = {name: words(name) for name in self.name_rows}
+
+        self.bitsets = {
+            attribute: {value: self._bits(rows) for value, rows in by_value.items()}
+            for attribute, by_value in rows_by_value.items()
+        }
+
+        # "total time <= times[i]" as one cumulative bitset per distinct time
+        times = np.array([recipe.get('total_time_minutes', 0) for recipe in recipes], dtype=np.int64)
+        order = np.argsort(times, kind='stable')
+        self.times = sorted(set(times.tolist()))
+        self.time_at_most = []
+        mask = np.zeros(self.size, dtype=bool)
+        position = 0
+        for time in self.times:
+            while position < self.size and times[order[position]] <= time:
+                mask[order[position]] = True
+                position += 1
+            self.time_at_most.append(self._mask_bits(mask))
+
+        self._term_bits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ——— Bitsets ———
+    def _mask_bits(self, mask: np.ndarray) -> int:
+        return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+    def _bits(self, rows: Iterable[int]) -> int:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[list(rows)] = True
+        return self._mask_bits(mask)
+
+    def rows(self, bits: int) -> np.ndarray:
+        """Set bits -> ascending recipe rows"""
+        if not bits:
+            return np.empty(0, dtype=np.intp)
+        raw = np.frombuffer(bits.to_bytes((self.size + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder='little')[:self.size])
+
+    def values(self, attribute: str) -> List[str]:
+        return sorted(self.bitsets[attribute])
+
+    # ——— Filters ———
+    def attribute_bits(self, attribute: str, values: Values) -> int:
+        """Recipes having any of the values (case-insensitive)"""
+        if isinstance(values, str):
+            values = [values]
+        bits = 0
+        for value in values:
+            bits |= self.bitsets[attribute].get(value.lower(), 0)
+        return bits
+
+    def time_bits(self, max_time: Optional[int] = None, min_time: Optional[int] = None) -> int:
+        bits = self.all
+        if max_time is not None:
+            i = bisect_right(self.times, max_time) - 1
+            bits &= self.time_at_most[i] if i >= 0 else 0
+        if min_time is not None:
+            i = bisect_right(self.times, min_time - 1) - 1
+            if i >= 0:
+                bits &= ~self.time_at_most[i]
+        return bits
+
+    def term_bits(self, term: str) -> int:
+        """Recipes containing an ingredient that matches term (or an ingredient of its allergen group)"""
+        term = term.lower().strip()
+        with self._lock:
+            bits = self._term_bits.get(term)
+        if bits is not None:
+            return bits
+
+        targets = allergen_words(term) or [words(term)]
+        mask = np.zeros(self.size, dtype=bool)
+        for name, rows in self.name_rows.items():
+            if any(target and contains_words(self.name_words[name], target) for target in targets):
+                mask[rows] = True
+        bits = self._mask_bits(mask)
+
+        with self._lock:
+            if len(self._term_bits) >= MAX_CACHED_TERMS:
+                self._term_bits.clear()
+            self._term_bits[term] = bits
+        return bits
+
+    def unmatched_terms(self, terms: Union[str, Iterable[str]]) -> List[str]:
+        """Terms that are neither an allergen group nor part of any recipe ingredient name"""
+        if isinstance(terms, str):
+            terms = parse_terms(terms)
+        return [term for term in terms
+                if term.strip() and allergen_words(term) is None and not self.term_bits(term)]
+
+    def query(self, meal_type: Values = None, cuisine: Values = None, difficulty: Values = None,
+              category: Values = None, max_time: Optional[int] = None, min_time: Optional[int] = None,
+              exclude: Union[str, Sequence[str]] = ()) -> int:
+        """Bitset of the recipes passing every given filter"""
+        if isinstance(exclude, str):
+            exclude = parse_terms(exclude)
+        bits = self.all
+        for attribute, values in (('meal_type', meal_type), ('cuisine', cuisine),
+                                  ('difficulty', difficulty), ('category', category)):
+            if values:
+                bits &= self.attribute_bits(attribute, values)
+        if max_time is not None or min_time is not None:
+            bits &= self.time_bits(max_time, min_time)
+        for term in exclude:
+            if term.strip():
+                bits &= ~self.term_bits(term)
+        return bits
+
+    def search(self, **filters) -> List[int]:
+        """Rows of the recipes passing every filter, in recipe order (see query)"""
+        return self.rows(self.query(**filters)).tolist()
@@ -0,0 +1,157 @@
+"""
+Precomputed top-k recipe rankings per (person, meal type, objective).
+
+Suggestions only ever show the best few recipes of a meal type, so instead of sorting every
+recipe per call the best `depth` are selected in O(n) with np.partition and cached; top()
+is then a slice of a cached list. Ties keep recipe order, like WeeklyMenuPlanner.
+
+Lists are tied to a ScoreStore.version. After a score change, apply_changes() drops only
+the lists a moved recipe could enter, leave or reorder; the rest move to the new version.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from menu_planner import MEAL_TYPES
+from recipe_index import RecipeIndex, parse_terms
+from rescoring import Changes, RecipeScoreCache
+from score_store import GENERAL
+
+MINIMIZE = 'minimize'
+MAXIMIZE = 'maximize'
+OBJECTIVES = (MINIMIZE, MAXIMIZE)
+DEFAULT_DEPTH = 25
+
+Key = Tuple[str, Optional[str], str]
+
+
+def check_objective(objective: str):
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {OBJECTIVES}")
+
+
+def select_top(scores: np.ndarray, rows: np.ndarray, k: int, objective: str = MINIMIZE) -> np.ndarray:
+    """Positions (into rows) of the k best scores, best first, ties in row order"""
+    keys = scores if objective == MINIMIZE else -scores
+    if k < len(keys):
+        # Everything up to the k-th key; boundary ties are resolved by the stable sort below
+        kth = np.partition(keys, k - 1)[k - 1]
+        keep = np.flatnonzero(keys <= kth)
+    else:
+        keep = np.arange(len(keys))
+    return keep[np.lexsort((rows[keep], keys[keep]))][:k]
+
+
+class Ranking:
+    def __init__(self, version: int, rows: np.ndarray, scores: np.ndarray, candidates: int, objective: str):
+        self.version = version
+        self.rows = rows
+        self.scores = scores
+        self.row_set = frozenset(rows.tolist())
+        # Holds every candidate, so nothing outside it can enter
+        self.exhaustive = len(rows) == candidates
+        self.objective = objective
+
+    def affected_by(self, moved: Optional[Dict[int, float]], is_candidate) -> bool:
+        if moved is None:
+            return True
+        for row, score in moved.items():
+            if row in self.row_set:
+                return True
+            if self.exhaustive or not is_candidate(row):
+                continue
+            worst = self.scores[-1]
+            if (score <= worst) if self.objective == MINIMIZE else (score >= worst):
+                return True
+        return False
+
+
+class RecipeRankings:
+    """Cached top-`depth` lists; top() answers from them when k <= depth"""
+
+    def __init__(self, score_cache: RecipeScoreCache, recipe_index: RecipeIndex, depth: int = DEFAULT_DEPTH):
+        self.score_cache = score_cache
+        self.store = score_cache.store
+        self.index = recipe_index
+        self.depth = depth
+        self._lists: Dict[Key, Ranking] = {}
+        self._meal_bits: Dict[Optional[str], int] = {}
+        self._lock = threading.Lock()
+
+    def _candidate_bits(self, meal_type: Optional[str]) -> int:
+        bits = self._meal_bits.get(meal_type)
+        if bits is None:
+            bits = self.index.all if meal_type is None else self.index.attribute_bits('meal_type', meal_type)
+            self._meal_bits[meal_type] = bits
+        return bits
+
+    def _rank(self, person: str, bits: int, objective: str, depth: int, version: int) -> Ranking:
+        rows = self.index.rows(bits)
+        scores = np.asarray(self.score_cache.averages(person), dtype=np.float64)[rows]
+        best = select_top(scores, rows, depth, objective)
+        return Ranking(version, rows[best], scores[best], len(rows), objective)
+
+    def ranking(self, person: str, meal_type: Optional[str] = None, objective: str = MINIMIZE) -> Ranking:
+        """The cached top-`depth` list, computed on first use or after a change it couldn't absorb"""
+        check_objective(objective)
+        key = (person, meal_type, objective)
+        with self._lock:
+            ranking = self._lists.get(key)
+        version = self.store.version
+        if ranking is None or ranking.version != version:
+            ranking = self._rank(person, self._candidate_bits(meal_type), objective, self.depth, version)
+            with self._lock:
+                self._lists[key] = ranking
+        return ranking
+
+    def top(self, person: str, meal_type: Optional[str] = None, k: int = 5, objective: str = MINIMIZE,
+            exclude: Union[str, Sequence[str]] = ()) -> List[Tuple[int, float]]:
+        """(recipe row, average score) of the k best recipes, optionally excluding ingredients"""
+        check_objective(objective)
+        if k <= 0:
+            return []
+        if isinstance(exclude, str):
+            exclude = parse_terms(exclude)
+        excluded = 0
+        for term in exclude:
+            if term.strip():
+                excluded |= self.index.term_bits(term)
+        if k <= self.depth:
+            ranking = self.ranking(person, meal_type, objective)
+            picked = [(row, score) for row, score in zip(ranking.rows.tolist(), ranking.scores.tolist())
+                      if not (excluded >> row) & 1]
+            if len(picked) >= k or ranking.exhaustive:
+                return picked[:k]
+        # Deeper than the cache, or exclusions emptied it: rank the filtered candidates directly
+        bits = self._candidate_bits(meal_type) & ~excluded
+        ranking = self._rank(person, bits, objective, k, self.store.version)
+        return list(zip(ranking.rows.tolist(), ranking.scores.tolist()))
+
+    def precompute(self, people: Iterable[str], meal_types: Sequence[Optional[str]] = tuple(MEAL_TYPES) + (None,),
+                   objectives: Sequence[str] = OBJECTIVES):
+        for person in people:
+            for meal_type in meal_types:
+                for objective in objectives:
+                    self.ranking(person, meal_type, objective)
+
+    def apply_changes(self, person: str, changes: Changes, before: int) -> int:
+        """Keep the lists a score change can't affect (see RecipeScoreCache.refresh); returns how many were dropped"""
+        dropped = 0
+        with self._lock:
+            version = self.store.version
+            for key, ranking in list(self._lists.items()):
+                name, meal_type, _ = key
+                bits = self._candidate_bits(meal_type)
+                if ranking.version != before or (
+                        (name == person or person == GENERAL)
+                        and ranking.affected_by(changes.get(name), lambda row: (bits >> row) & 1)):
+                    del self._lists[key]
+                    dropped += 1
+                else:
+                    ranking.version = version
+        return dropped
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'lists': len(self._lists), 'depth': self.depth}
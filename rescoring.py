@@ -0,0 +1,181 @@
+"""
+Incremental rescoring: when some ingredient scores change, recompute only the recipes that
+use those ingredients and report which tracked weekly menus the change made stale.
+
+    RecipeDependencyIndex   ingredient row -> rows of the recipes using it (CSR arrays)
+    RecipeScoreCache        person -> per-recipe averages, valid for one ScoreStore.version
+    MenuRegistry            planned menus, flagged stale when a score they depend on moves
+
+A menu is stale when one of its recipes changed score, or when a changed recipe now scores
+at least as well as the worst recipe the menu serves (it could win a slot on a re-plan).
+Changes that don't move a rounded average leave menus alone.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from batch_scorer import BatchScorer, round_averages
+from score_store import GENERAL
+
+# {person: {recipe row: new average}}; None when a person's column had to be dropped
+Changes = Dict[str, Optional[Dict[int, float]]]
+
+
+class RecipeDependencyIndex:
+    """Ingredient row -> recipe rows, built from the scorer's recipe x ingredient entries"""
+
+    def __init__(self, scorer: BatchScorer):
+        n_ingredients = len(scorer.ingredient_names)
+        order = np.argsort(scorer.entry_ingredients, kind='stable')
+        self.recipes = np.asarray(scorer.entry_recipes)[order]
+        self.indptr = np.zeros(n_ingredients + 1, dtype=np.int64)
+        np.cumsum(np.bincount(scorer.entry_ingredients, minlength=n_ingredients), out=self.indptr[1:])
+
+    def recipes_for(self, rows: Iterable[int]) -> np.ndarray:
+        """Sorted rows of every recipe that uses at least one of the ingredient rows"""
+        parts = [self.recipes[self.indptr[row]:self.indptr[row + 1]] for row in rows]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(parts))
+
+
+class PersonScores:
+    def __init__(self, version: int, totals: np.ndarray, matched: np.ndarray):
+        self.version = version
+        self.totals = totals
+        self.matched = matched
+        self.averages = round_averages(totals, matched)
+
+
+class RecipeScoreCache:
+    """Per-person recipe averages, rescored per affected recipe when scores change"""
+
+    def __init__(self, scorer: BatchScorer):
+        self.scorer = scorer
+        self.store = scorer.score_store
+        self.index = RecipeDependencyIndex(scorer)
+        self.recipe_index = {recipe_id: row for row, recipe_id in enumerate(scorer.recipe_ids)}
+        # Entries are grouped by recipe, so recipe r owns entries offsets[r]:offsets[r + 1]
+        self.offsets = np.searchsorted(scorer.entry_recipes, np.arange(len(scorer.recipe_ids) + 1))
+        self._columns: Dict[str, PersonScores] = {}
+        self._lock = threading.Lock()
+
+    def _score_recipes(self, person: str, recipe_rows: np.ndarray):
+        """Totals and match counts for a sorted subset of recipes (same arithmetic as score_all)"""
+        entries = np.concatenate([
+            np.arange(self.offsets[row], self.offsets[row + 1]) for row in recipe_rows
+        ]) if len(recipe_rows) else np.empty(0, dtype=np.intp)
+        scores = self.store.resolve(person, self.scorer.entry_ingredients[entries])
+        mask = ~np.isnan(scores)
+        weighted = np.where(mask, scores * self.scorer.entry_weights[entries], 0.0)
+        local = np.searchsorted(recipe_rows, self.scorer.entry_recipes[entries])
+        totals = np.zeros(len(recipe_rows))
+        matched = np.zeros(len(recipe_rows), dtype=np.int64)
+        np.add.at(totals, local, weighted)
+        np.add.at(matched, local, mask.astype(np.int64))
+        return totals, matched
+
+    def averages(self, person: str) -> List[float]:
+        """Rounded average score of every recipe for person, in recipe order"""
+        with self._lock:
+            column = self._columns.get(person)
+            if column is None or column.version != self.store.version:
+                version = self.store.version
+                scores = self.scorer.score_all([person])
+                column = self._columns[person] = PersonScores(version, scores.totals[:, 0], scores.matched[:, 0])
+            return column.averages
+
+    def refresh(self, person: str, rows: Iterable[int], before: int) -> Changes:
+        """
+        Rescore after person's scores changed at the ingredient `rows` ('general' affects
+        everyone); `before` is the store version the change was applied to. Returns the
+        averages that moved per cached person.
+        """
+        recipe_rows = self.index.recipes_for(rows)
+        changes: Changes = {}
+        with self._lock:
+            version = self.store.version
+            for name, column in list(self._columns.items()):
+                if column.version != before:
+                    # Missed an earlier change made behind our back: recompute on next use
+                    del self._columns[name]
+                    changes[name] = None
+                    continue
+                column.version = version
+                if name != person and person != GENERAL:
+                    continue
+                totals, matched = self._score_recipes(name, recipe_rows)
+                column.totals[recipe_rows] = totals
+                column.matched[recipe_rows] = matched
+                # Copy on write: planners may still be reading the previous list
+                averages = list(column.averages)
+                moved = {}
+                for row, average in zip(recipe_rows.tolist(), round_averages(totals, matched)):
+                    if averages[row] != average:
+                        averages[row] = average
+                        moved[row] = average
+                column.averages = averages
+                changes[name] = moved
+        return changes
+
+
+class TrackedMenu:
+    def __init__(self, menu_id: str, person: str, recipe_rows: Iterable[int], scores: Iterable[float],
+                 minimize: bool, options: Dict, version: int):
+        self.menu_id = menu_id
+        self.person = person
+        self.recipe_rows = frozenset(recipe_rows)
+        scores = list(scores)
+        self.worst = (max(scores) if minimize else min(scores)) if scores else None
+        self.minimize = minimize
+        self.options = options
+        self.version = version
+        self.stale = False
+
+    def affected_by(self, moved: Optional[Dict[int, float]]) -> bool:
+        if moved is None:
+            return True
+        for row, average in moved.items():
+            if row in self.recipe_rows or self.worst is None:
+                return True
+            if (average <= self.worst) if self.minimize else (average >= self.worst):
+                return True
+        return False
+
+
+class MenuRegistry:
+    """Weekly menus planned with a menu_id, so a score change can say which ones to redo"""
+
+    def __init__(self):
+        self._menus: Dict[str, TrackedMenu] = {}
+        self._lock = threading.Lock()
+
+    def track(self, menu: TrackedMenu):
+        with self._lock:
+            self._menus[menu.menu_id] = menu
+
+    def get(self, menu_id: str) -> Optional[TrackedMenu]:
+        return self._menus.get(menu_id)
+
+    def mark_changed(self, person: str, changes: Changes) -> List[str]:
+        """Flag menus affected by a change to person's scores; returns the newly stale IDs"""
+        stale = []
+        with self._lock:
+            for menu in self._menus.values():
+                if menu.stale or (person != GENERAL and menu.person != person):
+                    continue
+                # A person with no cached column can't be checked, so assume the worst
+                if menu.affected_by(changes.get(menu.person)):
+                    menu.stale = True
+                    stale.append(menu.menu_id)
+        return stale
+
+    def mark_all_stale(self):
+        with self._lock:
+            for menu in self._menus.values():
+                menu.stale = True
+
+    def stale(self) -> List[str]:
+        with self._lock:
+            return [menu.menu_id for menu in self._menus.values() if menu.stale]
@@ -0,0 +1,251 @@
+"""
+Columnar ingredient scores: a dense general baseline plus sparse per-user overrides.
+
+    general             float64[n_ingredients], NaN where there is no score
+    overrides[user]     (sorted int32 ingredient rows, float64 scores)
+
+A lookup for a user returns the user's override if there is one, else the general score,
+so memory grows with the number of overrides rather than users x ingredients. Users can
+be added, changed and removed at runtime; on disk the overrides are stored as CSR arrays.
+Every change bumps `version` and returns the ingredient rows it touched, which is what
+incremental rescoring keys on.
+"""
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+GENERAL = 'general'
+
+Overrides = Tuple[np.ndarray, np.ndarray]
+_EMPTY: Overrides = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64))
+
+
+def column_person(header: str) -> str:
+    """'general people inflammation' -> 'general', 'Sam inflammation' -> 'sam'"""
+    name = header.strip().lower()
+    if name.endswith(' inflammation'):
+        name = name[:-len(' inflammation')].strip()
+    return GENERAL if name.startswith(GENERAL) else name
+
+
+class IngredientScores(Mapping):
+    """One ingredient's scores: person -> override-else-general (None when neither exists)"""
+
+    def __init__(self, store: 'ScoreStore', row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, person: str) -> Optional[float]:
+        return self.store.score_at(person, self.row)
+
+    def get(self, person: str, default=None) -> Optional[float]:
+        score = self.store.score_at(person, self.row)
+        return default if score is None else score
+
+    def __iter__(self):
+        # The baseline plus every user with an override for this ingredient
+        yield GENERAL
+        for user in self.store.users():
+            if self.store.has_override(user, self.row):
+                yield user
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class ScoreTable(Mapping):
+    """Read-only ingredient name -> IngredientScores view"""
+
+    def __init__(self, store: 'ScoreStore'):
+        self.store = store
+
+    def __getitem__(self, name: str) -> IngredientScores:
+        return IngredientScores(self.store, self.store.index[name])
+
+    def __contains__(self, name) -> bool:
+        return name in self.store.index
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def __len__(self) -> int:
+        return len(self.store.names)
+
+
+class ScoreStore:
+    """Dense general scores with sparse per-user overrides"""
+
+    def __init__(self, names: List[str], general: np.ndarray, overrides: Optional[Dict[str, Overrides]] = None):
+        self.names = list(names)
+        self.index = {name: row for row, name in enumerate(self.names)}
+        self.general = general
+        self._overrides: Dict[str, Overrides] = dict(overrides or {})
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @classmethod
+    def from_table(cls, table: Dict[str, Dict[str, Optional[float]]]) -> 'ScoreStore':
+        """Build from ingredient -> {person: score}; scores that differ from general become overrides"""
+        names = list(table)
+        general = np.array([
+            np.nan if scores.get(GENERAL) is None else scores[GENERAL] for scores in table.values()
+        ], dtype=np.float64)
+        per_user: Dict[str, Dict[int, float]] = {}
+        for row, scores in enumerate(table.values()):
+            for person, score in scores.items():
+                if person != GENERAL and score is not None:
+                    # A user whose scores all match general still exists, just without overrides
+                    overrides = per_user.setdefault(person, {})
+                    if score != general[row]:
+                        overrides[row] = score
+        store = cls(names, general)
+        for user, rows in per_user.items():
+            store._overrides[user] = store._pack(rows)
+        return store
+
+    @classmethod
+    def from_csr(cls, names: List[str], general: np.ndarray, users: List[str], indptr: np.ndarray,
+                 indices: np.ndarray, values: np.ndarray) -> 'ScoreStore':
+        overrides = {
+            user: (indices[indptr[i]:indptr[i + 1]], values[indptr[i]:indptr[i + 1]])
+            for i, user in enumerate(users)
+        }
+        return cls(names, general, overrides)
+
+    def to_csr(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """(users, indptr, indices, values) with user i's overrides at indptr[i]:indptr[i + 1]"""
+        with self._lock:
+            items = list(self._overrides.items())
+        users = [user for user, _ in items]
+        indptr = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum([len(rows) for _, (rows, _) in items], out=indptr[1:])
+        indices = np.concatenate([rows for _, (rows, _) in items]) if items else _EMPTY[0]
+        values = np.concatenate([scores for _, (_, scores) in items]) if items else _EMPTY[1]
+        return users, indptr, indices.astype(np.int32), values.astype(np.float64)
+
+    # ——— Users ———
+    def users(self) -> List[str]:
+        with self._lock:
+            return list(self._overrides)
+
+    def people(self) -> List[str]:
+        return [GENERAL] + self.users()
+
+    def has_user(self, user: str) -> bool:
+        return user == GENERAL or user in self._overrides
+
+    def _pack(self, rows: Dict[int, float]) -> Overrides:
+        order = sorted(rows)
+        return (np.array(order, dtype=np.int32), np.array([rows[row] for row in order], dtype=np.float64))
+
+    def _rows(self, scores: Dict[str, float]) -> Dict[int, float]:
+        unknown = [name for name in scores if name not in self.index]
+        if unknown:
+            raise KeyError(f"Unknown ingredients: {', '.join(sorted(unknown)[:5])}")
+        return {self.index[name]: float(score) for name, score in scores.items()}
+
+    def set_user(self, user: str, scores: Dict[str, float]) -> np.ndarray:
+        """Add a user (or replace all of their overrides); returns the rows whose score may have changed"""
+        if user == GENERAL:
+            raise ValueError("The general baseline has no overrides")
+        packed = self._pack(self._rows(scores))
+        with self._lock:
+            previous = self._overrides.get(user, _EMPTY)[0]
+            self._overrides[user] = packed
+            self.version += 1
+        return np.union1d(previous, packed[0])
+
+    def update_user(self, user: str, scores: Dict[str, float]) -> np.ndarray:
+        """Add or change some of a user's overrides; returns the rows given"""
+        if user == GENERAL:
+            raise ValueError("The general baseline has no overrides")
+        rows = self._rows(scores)
+        with self._lock:
+            current_rows, current_scores = self._overrides.get(user, _EMPTY)
+            merged = dict(zip(current_rows.tolist(), current_scores.tolist()))
+            merged.update(rows)
+            self._overrides[user] = self._pack(merged)
+            self.version += 1
+        return np.array(sorted(rows), dtype=np.int32)
+
+    def remove_user(self, user: str) -> bool:
+        with self._lock:
+            removed = self._overrides.pop(user, None) is not None
+            if removed:
+                self.version += 1
+        return removed
+
+    def set_general(self, scores: Dict[str, float]) -> np.ndarray:
+        """Change baseline scores (NaN clears one); returns the rows given"""
+        rows = self._rows(scores)
+        with self._lock:
+            if not self.general.flags.writeable:
+                self.general = np.array(self.general)  # Copy out of a read-only mmap
+            for row, score in rows.items():
+                self.general[row] = score
+            self.version += 1
+        return np.array(sorted(rows), dtype=np.int32)
+
+    def override_rows(self, user: str) -> np.ndarray:
+        return self._overrides.get(user, _EMPTY)[0]
+
+    def user_overrides(self, user: str) -> Dict[str, float]:
+        rows, scores = self._overrides.get(user, _EMPTY)
+        return {self.names[row]: score for row, score in zip(rows.tolist(), scores.tolist())}
+
+    # ——— Lookups ———
+    def has_override(self, user: str, row: int) -> bool:
+        rows, _ = self._overrides.get(user, _EMPTY)
+        position = np.searchsorted(rows, row)
+        return position < len(rows) and rows[position] == row
+
+    def score_at(self, user: str, row: int) -> Optional[float]:
+        rows, scores = self._overrides.get(user, _EMPTY)
+        position = np.searchsorted(rows, row)
+        if position < len(rows) and rows[position] == row:
+            return float(scores[position])
+        score = self.general[row]
+        return None if np.isnan(score) else float(score)
+
+    def score(self, user: str, name: str) -> Optional[float]:
+        return self.score_at(user, self.index[name])
+
+    def resolve(self, user: str, rows: np.ndarray) -> np.ndarray:
+        """Scores for many ingredient rows at once (NaN where neither override nor general exists)"""
+        result = self.general[rows]
+        override_rows, override_scores = self._overrides.get(user, _EMPTY)
+        if len(override_rows):
+            positions = np.minimum(np.searchsorted(override_rows, rows), len(override_rows) - 1)
+            hit = override_rows[positions] == rows
+            result = np.where(hit, override_scores[positions], result)
+        return result
+
+    def table(self) -> ScoreTable:
+        return ScoreTable(self)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            overrides = list(self._overrides.values())
+        count = sum(len(rows) for rows, _ in overrides)
+        return {
+            'ingredients': len(self.names),
+            'users': len(overrides),
+            'overrides': count,
+            'bytes': int(self.general.nbytes + sum(rows.nbytes + scores.nbytes for rows, scores in overrides))
+        }
+
+
+def load_rows(rows: Iterable[Dict[str, str]], fieldnames: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
+    """CSV rows -> ingredient -> {person: score}; later rows replace earlier ones"""
+    columns = [(field, column_person(field)) for field in fieldnames
+               if field.strip().lower().endswith('inflammation')]
+    table = {}
+    for row in rows:
+        ingredient = row['ingredient'].lower().strip()
+        table[ingredient] = {
+            person: float(row[field]) if row[field] else None
+            for field, person in columns
+        }
+    return table
@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from ingredient_matcher import singular
+
+# unit -> (canonical unit, factor to the canonical unit)
+UNIT_CONVERSIONS = {
+    'g': ('grams', 1), 'gram': ('grams', 1), 'grams': ('grams', 1),
+    'kg': ('grams', 1000), 'kilogram': ('grams', 1000), 'kilograms': ('grams', 1000),
+    'oz': ('grams', 28.35), 'ounce': ('grams', 28.35), 'ounces': ('grams', 28.35),
+    'lb': ('grams', 453.6), 'lbs': ('grams', 453.6), 'pound': ('grams', 453.6), 'pounds': ('grams', 453.6),
+    'ml': ('ml', 1), 'milliliter': ('ml', 1), 'milliliters': ('ml', 1),
+    'l': ('ml', 1000), 'liter': ('ml', 1000), 'liters': ('ml', 1000),
+    'cup': ('ml', 240), 'cups': ('ml', 240),
+    'tbsp': ('ml', 15), 'tablespoon': ('ml', 15), 'tablespoons': ('ml', 15),
+    'tsp': ('ml', 5), 'teaspoon': ('ml', 5), 'teaspoons': ('ml', 5),
+    'piece': ('pieces', 1), 'pieces': ('pieces', 1), 'pcs': ('pieces', 1), 'whole': ('pieces', 1),
+    'clove': ('pieces', 1), 'cloves': ('pieces', 1)
+}
+
+
+# Names for the same product a shopper would buy either way (singular head word -> merged key)
+SYNONYMS = {
+    'scallion': 'green onion', 'spring onion': 'green onion',
+    'garbanzo bean': 'chickpea', 'garbanzo': 'chickpea',
+    'courgette': 'zucchini', 'aubergine': 'eggplant', 'capsicum': 'bell pepper',
+    'catsup': 'ketchup', 'prawn': 'shrimp',
+    'bicarbonate of soda': 'baking soda', 'corn starch': 'cornstarch',
+    'icing sugar': 'powdered sugar', 'confectioners sugar': 'powdered sugar',
+    'minced beef': 'ground beef', 'mince': 'ground beef'
+}
+
+
+def normalize_quantity(quantity: float, unit: str) -> Tuple[float, str]:
+    """Convert a quantity to its canonical unit (grams, ml or pieces); unknown units pass through"""
+    unit = (unit or '').lower().strip()
+    canonical, factor = UNIT_CONVERSIONS.get(unit, (unit, 1))
+    return quantity * factor, canonical
+
+
+class ShoppingListAggregator:
+    """
+    Aggregate ingredients from a stream of weekly menus into one shopping list.
+
+    Quantities are converted to canonical units and lines for the same product are merged:
+    same name up to case and plurals, or an entry of `synonyms` ("scallions" and "green
+    onions"). The scorer's ingredient matching is not used, since its approximations
+    (hamburger buns -> bread) are different products to a shopper. An item keeps the first
+    name seen and counts its uses per recipe ID, so memory stays bounded by the recipe
+    table however many menus of a household or batch are streamed through.
+    """
+
+    def __init__(self, recipes_by_id: Optional[Dict] = None, synonyms: Optional[Dict[str, str]] = None):
+        self.recipes_by_id = recipes_by_id or {}
+        self.synonyms = SYNONYMS if synonyms is None else synonyms
+        # (group key, canonical unit) -> item
+        self.items: Dict[Tuple[str, str], Dict] = {}
+        self.menus = 0
+
+    def _group_key(self, name: str) -> str:
+        # Plural-insensitive on the head word: "cherry tomatoes" == "cherry tomato"
+        words = name.lower().split() or ['']
+        words[-1] = singular(words[-1])
+        normalized = ' '.join(words)
+        return self.synonyms.get(normalized, normalized)
+
+    def add_ingredient(self, name: str, quantity: float, unit: str, recipe_id):
+        quantity, canonical_unit = normalize_quantity(quantity, unit)
+        key = (self._group_key(name), canonical_unit)
+        item = self.items.get(key)
+        if item is None:
+            item = self.items[key] = {
+                'name': name,
+                'unit': canonical_unit,
+                'total_quantity': 0,
+                'names': [],
+                'recipes': {}
+            }
+        item['total_quantity'] += quantity
+        if name not in item['names']:
+            item['names'].append(name)
+        item['recipes'][recipe_id] = item['recipes'].get(recipe_id, 0) + 1
+
+    def add_menu(self, weekly_menu: Dict):
+        """Add a create_weekly_menu result (or a compact menu whose meals carry a recipe_id)"""
+        for meals in weekly_menu['weekly_menu'].values():
+            for meal_data in meals.values():
+                recipe = meal_data.get('recipe') or self.recipes_by_id[meal_data['recipe_id']]
+                for ingredient in recipe['ingredients']:
+                    self.add_ingredient(ingredient['name'], ingredient['quantity'], ingredient['unit'], recipe['id'])
+        self.menus += 1
+
+    def add_menus(self, weekly_menus: Iterable[Dict]) -> 'ShoppingListAggregator':
+        for weekly_menu in weekly_menus:
+            self.add_menu(weekly_menu)
+        return self
+
+    def result(self) -> Dict:
+        """Shopping list keyed by the first recipe name seen for each merged ingredient"""
+        shopping_list = {}
+        for item in self.items.values():
+            name = item['name']
+            if name in shopping_list:
+                name = f"{name} ({item['unit']})"
+            shopping_list[name] = {
+                'unit': item['unit'],
+                'total_quantity': round(item['total_quantity'], 2),
+                'names': item['names'],
+                # recipe ID -> number of meals using it
+                'used_in_recipes': item['recipes']
+            }
+        return {
+            'shopping_list': shopping_list,
+            'total_unique_ingredients': len(shopping_list)
+        }